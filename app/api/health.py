@@ -0,0 +1,20 @@
+import os
+from fastapi import APIRouter, Request
+from app.core.process_stats import memory_usage
+
+router = APIRouter()
+
+@router.get("/health")
+def health_endpoint(request: Request):
+    """
+    이 요청을 처리한 워커 프로세스의 상태와 메모리 사용량을 반환합니다.
+    여러 워커로 실행 중이면 요청마다 다른 워커가 응답할 수 있습니다.
+    """
+    holder = getattr(request.app.state, 'recommendation', None)
+    state = holder.get() if holder is not None and holder.loaded else None
+    return {
+        "pid": os.getpid(),
+        "memory": memory_usage(),
+        "recommendation_loaded": state is not None,
+        "recommendation_version": state.version if state is not None else None,
+    }
\ No newline at end of file
@@ -0,0 +1,169 @@
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.core import metrics
+from app.core.embedding_cache import normalize_text
+
+# .env 파일에서 API 키 로드
+load_dotenv()
+
+# 임베딩/LLM 백엔드 선택: "upstage"(기본, Upstage API) 또는 "local"(네트워크 없이 동작하는 결정적 백엔드)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "upstage")
+
+UPSTAGE_BASE_URL = "https://api.upstage.ai/v1"
+UPSTAGE_TIMEOUT = float(os.getenv("UPSTAGE_TIMEOUT", "10"))
+UPSTAGE_MAX_RETRIES = int(os.getenv("UPSTAGE_MAX_RETRIES", "2"))
+UPSTAGE_MAX_CONNECTIONS = int(os.getenv("UPSTAGE_MAX_CONNECTIONS", "100"))
+UPSTAGE_EMBEDDING_MODEL = "embedding-passage"
+UPSTAGE_CHAT_MODEL = "solar-pro"
+
+# 로컬 백엔드: 임베딩 차원(Upstage 임베딩과 같은 4096), 문자 n-gram 크기, 고정 응답
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "4096"))
+LOCAL_NGRAM_SIZES = (1, 2, 3)
+LOCAL_CHAT_REPLY = os.getenv("LOCAL_CHAT_REPLY", "집중해서 작업하는 중, 차분하고 잔잔한 분위기")
+
+
+class UpstageBackend:
+    """
+    Upstage API(OpenAI 호환)로 임베딩과 채팅 응답을 받습니다.
+    클라이언트는 처음 호출할 때 만들고, 비동기 클라이언트는 프로세스에서 하나의 HTTP 연결 풀을 공유합니다.
+    """
+
+    name = "upstage"
+
+    def __init__(self, model: str = UPSTAGE_EMBEDDING_MODEL, chat_model: str = UPSTAGE_CHAT_MODEL):
+        self.model = model
+        self.chat_model = chat_model
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+                self._client = OpenAI(
+                    api_key=os.getenv("UPSTAGE_API_KEY"),
+                    base_url=UPSTAGE_BASE_URL
+                )
+            return self._client
+
+    def get_async_client(self):
+        """타임아웃과 재시도(지수 백오프)는 UPSTAGE_TIMEOUT / UPSTAGE_MAX_RETRIES로 설정합니다."""
+        if self._async_client is None:
+            import httpx
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(
+                api_key=os.getenv("UPSTAGE_API_KEY"),
+                base_url=UPSTAGE_BASE_URL,
+                timeout=UPSTAGE_TIMEOUT,
+                max_retries=UPSTAGE_MAX_RETRIES,
+                http_client=httpx.AsyncClient(
+                    timeout=UPSTAGE_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=UPSTAGE_MAX_CONNECTIONS,
+                        max_keepalive_connections=UPSTAGE_MAX_CONNECTIONS,
+                    ),
+                ),
+            )
+        return self._async_client
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """여러 텍스트를 한 번의 embeddings.create 호출로 임베딩합니다."""
+        with metrics.upstream_call("embeddings"):
+            response = self.client.embeddings.create(
+                model=self.model,
+                input=texts
+            )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def embed_async(self, texts: List[str]) -> List[List[float]]:
+        with metrics.upstream_call("embeddings"):
+            response = await self.get_async_client().embeddings.create(
+                model=self.model,
+                input=texts
+            )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        with metrics.upstream_call("chat"):
+            response = self.client.chat.completions.create(
+                model=model or self.chat_model,
+                messages=messages,
+                stream=False,
+            )
+        return response.choices[0].message.content
+
+    async def close(self):
+        """서버 종료 시 비동기 클라이언트의 연결 풀을 닫습니다."""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+
+class LocalBackend:
+    """
+    네트워크 없이 동작하는 결정적 백엔드. 부하 테스트, 벤치마크처럼 외부 API 없이 추천 파이프라인 전체를 돌릴 때 사용합니다.
+    - 임베딩: 문자 n-gram과 단어를 해시해 부호(+1/-1)와 함께 dim 차원에 누적한 뒤 L2 정규화 (비슷한 문장은 비슷한 벡터)
+    - 채팅: 고정 응답 (LOCAL_CHAT_REPLY)
+    """
+
+    name = "local"
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM, ngram_sizes=LOCAL_NGRAM_SIZES, reply: str = LOCAL_CHAT_REPLY):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.reply = reply
+        self.model = f"local-hashed-ngram-{dim}"
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        text = normalize_text(text).lower()
+        grams = [text[i:i + n] for n in self.ngram_sizes for i in range(len(text) - n + 1)]
+        grams.extend(text.split())
+        if not grams:
+            return np.zeros(self.dim, dtype=np.float32)
+        hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+        signs = np.where(hashes >> np.uint64(31) & np.uint64(1), -1.0, 1.0)
+        vector = np.bincount((hashes % np.uint64(self.dim)).astype(np.intp), weights=signs, minlength=self.dim)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text).tolist() for text in texts]
+
+    async def embed_async(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+    def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        return self.reply
+
+    async def close(self):
+        pass
+
+
+BACKENDS = {
+    UpstageBackend.name: UpstageBackend,
+    LocalBackend.name: LocalBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """MODEL_BACKEND 설정에 맞는 백엔드(프로세스에서 하나)를 반환합니다."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = BACKENDS.get(MODEL_BACKEND)
+                if backend is None:
+                    raise ValueError(f"unknown MODEL_BACKEND: {MODEL_BACKEND} (choose from {', '.join(BACKENDS)})")
+                _backend = backend()
+    return _backend
@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 텍스트 정규화: 유니코드 NFC, 앞뒤 공백 제거, 연속 공백을 한 칸으로."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def embedding_key(text: str, model: str) -> str:
+    """(정규화된 텍스트, 모델 이름)의 해시."""
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class SqliteVectorStore:
+    """
+    key -> float32 벡터를 저장하는 SQLite 파일. 여러 스레드에서 같은 연결을 잠금으로 공유합니다.
+    max_rows / ttl(초)을 주면 마지막으로 읽거나 쓴 시각(accessed)을 기준으로 오래된 벡터를 지웁니다.
+    (쓰기 evict_every번마다 만료된 행을 지우고, max_rows를 넘으면 오래된 순으로 max_rows의 90%까지 줄임)
+    None이면 제한 없이 보관합니다. (예시 문장 벡터 저장소처럼 prune으로 직접 정리하는 경우)
+    """
+
+    def __init__(self, path: str, max_rows: Optional[int] = None, ttl: Optional[float] = None, evict_every: int = 64):
+        self.path = path
+        self.max_rows = max_rows if max_rows and max_rows > 0 else None
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.evict_every = max(1, evict_every)
+        self._writes = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+                "accessed REAL NOT NULL DEFAULT 0)"
+            )
+            # accessed 열이 없던 이전 파일은 열을 추가 (기존 행은 지금 쓴 것으로 보고 TTL을 새로 시작)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(vectors)")}
+            if "accessed" not in columns:
+                conn.execute("ALTER TABLE vectors ADD COLUMN accessed REAL NOT NULL DEFAULT 0")
+                conn.execute("UPDATE vectors SET accessed = ?", (time.time(),))
+            conn.execute("CREATE INDEX IF NOT EXISTS vectors_accessed ON vectors (accessed)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        cutoff = now - self.ttl if self.ttl is not None else None
+        with self._lock:
+            conn = self._connect()
+            # SQLite 변수 개수 제한을 넘지 않도록 나눠서 조회
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, vector, accessed FROM vectors WHERE key IN ({placeholders})", chunk)
+                for key, blob, accessed in rows:
+                    if cutoff is None or accessed >= cutoff:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found and (self.max_rows is not None or self.ttl is not None):
+                # 읽은 벡터는 최근에 쓴 것으로 갱신 (제거 순서 기준)
+                conn.executemany("UPDATE vectors SET accessed = ? WHERE key = ?", ((now, key) for key in found))
+                conn.commit()
+        return found
+
+    def put(self, key: str, vector, model: str):
+        self.put_many({key: vector}, model)
+
+    def put_many(self, vectors: Dict[str, object], model: str):
+        rows = []
+        for key, vector in vectors.items():
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((key, model, int(array.shape[0]), array.tobytes(), time.time()))
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, model, dim, vector, accessed) VALUES (?, ?, ?, ?, ?)", rows)
+            self._writes += len(rows)
+            if self._writes >= self.evict_every:
+                self._writes = 0
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """만료된 행을 지우고, max_rows를 넘으면 마지막 사용 시각이 오래된 순으로 max_rows의 90%까지 지웁니다."""
+        removed = 0
+        if self.ttl is not None:
+            removed += conn.execute("DELETE FROM vectors WHERE accessed < ?", (time.time() - self.ttl,)).rowcount
+        if self.max_rows is not None:
+            excess = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] - self.max_rows
+            if excess > 0:
+                excess += self.max_rows // 10
+                removed += conn.execute(
+                    "DELETE FROM vectors WHERE key IN (SELECT key FROM vectors ORDER BY accessed LIMIT ?)",
+                    (excess,)).rowcount
+        self.evictions += removed
+
+    def prune(self, keep_keys: Iterable[str], model: str) -> int:
+        """model의 벡터 중 keep_keys에 없는 것을 지우고, 지운 개수를 반환합니다."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_keys (key TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM keep_keys")
+            conn.executemany("INSERT OR IGNORE INTO keep_keys (key) VALUES (?)", ((key,) for key in keep_keys))
+            cursor = conn.execute(
+                "DELETE FROM vectors WHERE model = ? AND key NOT IN (SELECT key FROM keep_keys)", (model,))
+            conn.execute("DELETE FROM keep_keys")
+            conn.commit()
+            return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class EmbeddingCache:
+    """
+    쿼리 임베딩 캐시. 크기가 제한된 메모리 LRU와, 재시작 후에도 남는 SQLite 디스크 계층으로 구성됩니다.
+    디스크 계층도 disk_max_rows개 / disk_ttl초(마지막 사용 기준)로 제한합니다. path가 None이면 메모리 계층만 사용합니다.
+    디스크 쓰기는 백그라운드 스레드 하나가 모아서 처리하므로 put은 메모리만 갱신하고 바로 돌아옵니다.
+    (이벤트 루프에서는 get_many_async로 조회: 메모리 LRU만 바로 보고 디스크 조회는 스레드에서)
+    """
+
+    def __init__(self, max_items: int = 1024, path: Optional[str] = None,
+                 disk_max_rows: Optional[int] = None, disk_ttl: Optional[float] = None, max_pending: int = 1024):
+        self.max_items = max_items
+        self.max_pending = max_pending
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = SqliteVectorStore(path, max_rows=disk_max_rows, ttl=disk_ttl) if path else None
+        # 디스크에 아직 쓰지 않은 벡터 (key -> (모델, 벡터)), _writing은 쓰는 중인 묶음
+        self._pending: "OrderedDict[str, Tuple[str, List[float]]]" = OrderedDict()
+        self._writing: Dict[str, Tuple[str, List[float]]] = {}
+        self._pending_changed = threading.Condition(self._lock)
+        self._writer: Optional[threading.Thread] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.dropped_writes = 0
+
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        return self.get_many([text], model)[0]
+
+    def get_many(self, texts: List[str], model: str) -> List[Optional[List[float]]]:
+        """texts 순서대로 캐시된 임베딩(없으면 None)을 반환합니다. 디스크를 직접 읽으므로 이벤트 루프에서는 get_many_async를 사용합니다."""
+        keys = [embedding_key(text, model) for text in texts]
+        found = self._lookup_memory(keys)
+        if len(found) < len(set(keys)):
+            found.update(self._lookup_disk([key for key in dict.fromkeys(keys) if key not in found]))
+        return self._collect(keys, found)
+
+    async def get_async(self, text: str, model: str) -> Optional[List[float]]:
+        return (await self.get_many_async([text], model))[0]
+
+    async def get_many_async(self, texts: List[str], model: str) -> List[Optional[List[float]]]:
+        """get_many의 비동기 버전. 메모리에 없는 것만 스레드에서 디스크로 조회합니다."""
+        keys = [embedding_key(text, model) for text in texts]
+        found = self._lookup_memory(keys)
+        if len(found) < len(set(keys)):
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if self.disk is not None:
+                found.update(await asyncio.to_thread(self._lookup_disk, missing))
+        return self._collect(keys, found)
+
+    def _lookup_memory(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    found[key] = embedding
+        return found
+
+    def _lookup_disk(self, keys: List[str]) -> Dict[str, List[float]]:
+        """아직 쓰지 않은 벡터와 디스크에서 keys를 찾아 메모리 LRU에 올립니다."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._pending.get(key) or self._writing.get(key)
+                if entry is not None:
+                    found[key] = entry[1]
+        rest = [key for key in keys if key not in found]
+        if self.disk is not None and rest:
+            try:
+                found.update({key: vector.tolist() for key, vector in self.disk.get_many(rest).items()})
+            except sqlite3.Error as e:
+                print(f"Embedding cache read error: {e}")
+        with self._lock:
+            self.disk_hits += len(found)
+            for key, embedding in found.items():
+                self._remember(key, embedding)
+        return found
+
+    def _collect(self, keys: List[str], found: Dict[str, List[float]]) -> List[Optional[List[float]]]:
+        """조회 결과를 keys 순서로 늘어놓고 찾지 못한 수를 셉니다."""
+        with self._lock:
+            for key in keys:
+                if key not in found:
+                    self.misses += 1
+        return [found.get(key) for key in keys]
+
+    def put(self, text: str, model: str, embedding: List[float]):
+        if not embedding:
+            return
+        key = embedding_key(text, model)
+        with self._lock:
+            self._remember(key, list(embedding))
+            if self.disk is None:
+                return
+            self._pending[key] = (model, embedding)
+            self._pending.move_to_end(key)
+            # 디스크가 쓰기를 못 따라가면 오래된 것부터 버림 (캐시이므로 다시 임베딩하면 됨)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped_writes += 1
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="embedding-cache-writer", daemon=True)
+                self._writer.start()
+            self._pending_changed.notify_all()
+
+    def _write_loop(self):
+        """쌓인 벡터를 모델별로 묶어 한 트랜잭션으로 씁니다."""
+        while True:
+            with self._pending_changed:
+                while not self._pending:
+                    self._pending_changed.wait()
+                self._writing, self._pending = dict(self._pending), OrderedDict()
+                batch = self._writing
+            by_model: Dict[str, Dict[str, List[float]]] = {}
+            for key, (model, embedding) in batch.items():
+                by_model.setdefault(model, {})[key] = embedding
+            for model, vectors in by_model.items():
+                try:
+                    self.disk.put_many(vectors, model)
+                except sqlite3.Error as e:
+                    print(f"Embedding cache write error: {e}")
+            with self._pending_changed:
+                self._writing = {}
+                self._pending_changed.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """대기 중인 디스크 쓰기가 끝날 때까지 기다립니다. (timeout 안에 끝났으면 True)"""
+        with self._pending_changed:
+            return self._pending_changed.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "pending_writes": len(self._pending),
+                "dropped_writes": self.dropped_writes,
+                "disk_evictions": self.disk.evictions if self.disk is not None else 0,
+            }
@@ -1,38 +1,211 @@
 import os
 import json
+import atexit
+import asyncio
+import threading
 import numpy as np
 from dotenv import load_dotenv
-from openai import OpenAI
-from typing import List, Tuple, Dict
-from sklearn.metrics.pairwise import cosine_similarity
-import pandas as pd
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterator, List, Tuple, Dict, Optional
+from app.core import metrics
+from app.core.backends import get_backend
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.embedding_cache import EmbeddingCache
+from app.core.result_cache import DEFAULT_SEMANTIC_THRESHOLD, ResultCache, SemanticCache, result_key
+from app.core.similarity import FeatureSimilarityEngine
+from app.core.sentence_index import load_sentence_index
+from app.core.track_store import AUDIO_FEATURES, TrackStore, iter_unique_top_k, select_unique_top_k
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # .env 파일에서 API 키 로드
 load_dotenv()
 
-# Upstage API 클라이언트 설정
-client = OpenAI(
-    api_key=os.getenv("UPSTAGE_API_KEY"),
-    base_url="https://api.upstage.ai/v1"
-)
-
 # 데이터 파일 경로를 모듈 상단에서 정의
 base_dir = os.path.dirname(os.path.abspath(__file__))  # .../app/core
 data_dir = os.path.abspath(os.path.join(base_dir, "..", "data"))  # .../app/data
 
+# 임베딩 모델 이름 (MODEL_BACKEND로 고른 백엔드의 모델, 캐시 키에 포함)
+EMBEDDING_MODEL = get_backend().model
+
+# save_embeddings.py가 만드는 바이너리 임베딩 아티팩트 (정규화된 float32 행렬 + feature별 행 구간 manifest)
+EMBEDDING_ARTIFACT = "feature_embeddings.npy"
+EMBEDDING_MANIFEST = "feature_embeddings_manifest.json"
+# build_track_catalog.py가 만드는 바이너리 곡 카탈로그 디렉터리
+TRACK_CATALOG_DIR = "track_catalog"
+# build_sentence_index.py가 만드는 예시 문장 검색 인덱스 디렉터리
+SENTENCE_INDEX_DIR = "sentence_index"
+
+# 쿼리 임베딩 캐시 (메모리 LRU + 디스크 SQLite, EMBEDDING_CACHE_PATH를 빈 값으로 두면 메모리만 사용)
+# 디스크 계층은 EMBEDDING_CACHE_DISK_ROWS개(4096차원 기준 행당 16KB, 기본 약 330MB)까지, 마지막 사용 후
+# EMBEDDING_CACHE_DISK_TTL초(기본 7일)까지 보관 (0이면 제한 없음)
+embedding_cache = EmbeddingCache(
+    max_items=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+    path=os.getenv("EMBEDDING_CACHE_PATH", os.path.join(data_dir, "embedding_cache.sqlite")) or None,
+    disk_max_rows=int(os.getenv("EMBEDDING_CACHE_DISK_ROWS", "20000")),
+    disk_ttl=float(os.getenv("EMBEDDING_CACHE_DISK_TTL", str(7 * 24 * 3600))),
+)
+# 디스크 쓰기는 백그라운드 스레드에서 하므로 종료 전에 남은 쓰기를 마침 (스크립트에서 get_embeddings를 쓴 경우 포함)
+atexit.register(embedding_cache.flush, 5.0)
+
+# 추천 결과 캐시 (정규화된 쿼리 + 파라미터 + 데이터 버전, LRU + TTL). RESULT_CACHE_SIZE=0이면 사용하지 않음
+result_cache = ResultCache(
+    max_items=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "300")),
+)
+# 쿼리 임베딩이 거의 같은(코사인 유사도 SEMANTIC_CACHE_THRESHOLD 이상) 이전 쿼리의 상위 feature와 곡 목록을 재사용하는 캐시
+# (임베딩 차원 4096 기준 항목당 16KB, SEMANTIC_CACHE_SIZE=0이면 사용하지 않음)
+semantic_cache = SemanticCache(
+    max_items=int(os.getenv("SEMANTIC_CACHE_SIZE", "1024")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", str(DEFAULT_SEMANTIC_THRESHOLD))),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "300")),
+)
+
+# 기본 추천 대상: 영어/한국어 곡, popularity 20 이상
+DEFAULT_LANGUAGES = ['English', 'Korean']
+DEFAULT_MIN_POPULARITY = 20
+
+# feature 유사도 계산 방식: 상위 n개 예시 평균(topn) 또는 뱅크 centroid(centroid)
+FEATURE_MODES = ("topn", "centroid")
+
+# 조건을 만족하는 언어 구간의 평균 곡 수가 처음 찾는 상위 곡 수(window)의 이 배수 이상이면 feature별 정렬 목록
+# (threshold algorithm)으로 상위 곡을 찾고, 적으면 전체 점수를 계산. threshold algorithm은 구간마다 window에 비례해
+# 정렬 목록을 내려가고, 전체 점수 계산은 곡 수에 비례하는 연속 메모리 행렬-벡터 곱이므로 두 값의 비율로 고름.
+# 균일 분포 합성 카탈로그, 기본 언어(구간 2개), top_k=20(window 80)에서 두 경로가 같아지는 비율은 서버마다
+# 약 7,500(1코어 VM, 조건 만족 1.2M곡)~30,000(조건 만족 4~5M곡)이었으므로 느린 쪽을 기본값으로 둠.
+# 서버에서 benchmark.py의 ranking_paths 결과로 다시 맞추세요. (0이면 항상 정렬 목록)
+RANKING_INDEX_MIN_RATIO = float(os.getenv("RANKING_INDEX_MIN_RATIO", "30000"))
+
+# 배치 추천에서 한 번에 만드는 점수 행렬의 최대 원소 수 (쿼리 수 x 대상 곡 수)
+BATCH_SCORE_BUDGET = int(os.getenv("BATCH_SCORE_BUDGET", str(16 * 1024 * 1024)))
+
 def get_embedding(text: str) -> List[float]:
-    """단일 텍스트의 임베딩을 반환합니다."""
+    """단일 텍스트의 임베딩을 반환합니다. (같은 텍스트는 캐시에서 바로 반환)"""
+    cached = embedding_cache.get(text, EMBEDDING_MODEL)
+    if cached is not None:
+        return cached
+    try:
+        embedding = get_backend().embed([text])[0]
+    except Exception as e:
+        print(f"Error getting embedding for text: {e}")
+        return []
+    embedding_cache.put(text, EMBEDDING_MODEL, embedding)
+    return embedding
+
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    여러 텍스트의 임베딩을 반환합니다. 캐시에 없는 텍스트만 모아 한 번의 API 호출로 임베딩합니다.
+    실패한 텍스트의 임베딩은 빈 리스트입니다.
+    """
+    embeddings = embedding_cache.get_many(texts, EMBEDDING_MODEL)
+    missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+    fetched = {}
+    if missing:
+        try:
+            for text, embedding in zip(missing, get_backend().embed(missing)):
+                fetched[text] = embedding
+                embedding_cache.put(text, EMBEDDING_MODEL, embedding)
+        except Exception as e:
+            print(f"Error getting embeddings for {len(missing)} texts: {e}")
+    return [embedding if embedding is not None else fetched.get(text, []) for text, embedding in zip(texts, embeddings)]
+
+async def close_async_client():
+    """서버 종료 시 백엔드의 비동기 클라이언트 연결 풀을 닫습니다."""
+    await get_backend().close()
+
+async def embed_texts_async(texts: List[str]) -> List[List[float]]:
+    """여러 텍스트를 한 번의 백엔드 호출로 임베딩합니다."""
+    return await get_backend().embed_async(texts)
+
+async def get_embeddings_async(texts: List[str]) -> List[List[float]]:
+    """get_embeddings의 비동기 버전. (디스크 캐시 조회는 스레드에서, 쓰기는 캐시의 백그라운드 스레드에서)"""
+    embeddings = await embedding_cache.get_many_async(texts, EMBEDDING_MODEL)
+    missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+    fetched = {}
+    if missing:
+        try:
+            fetched = dict(zip(missing, await embed_texts_async(missing)))
+            for text, embedding in fetched.items():
+                embedding_cache.put(text, EMBEDDING_MODEL, embedding)
+        except Exception as e:
+            print(f"Error getting embeddings for {len(missing)} texts: {e}")
+    return [embedding if embedding is not None else fetched.get(text, []) for text, embedding in zip(texts, embeddings)]
+
+# 요청 시점의 임베딩 호출을 짧은 시간 동안 모아 배치로 보내는 디스패처
+embedding_batcher = EmbeddingBatcher(
+    embed_texts_async,
+    window=float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5")) / 1000,
+    max_batch=int(os.getenv("EMBEDDING_BATCH_MAX", "32")),
+)
+
+def _embedding_metrics():
+    """임베딩 캐시/배처가 세고 있는 값을 /metrics에 노출합니다."""
+    cache = embedding_cache.stats()
+    return [
+        ("mcp_embedding_cache_lookups_total", "counter", "쿼리 임베딩 캐시 조회 결과별 수", [
+            ({"result": "memory_hit"}, cache["memory_hits"]),
+            ({"result": "disk_hit"}, cache["disk_hits"]),
+            ({"result": "miss"}, cache["misses"]),
+        ]),
+        ("mcp_embedding_cache_items", "gauge", "메모리 캐시에 있는 쿼리 임베딩 수", [({}, cache["memory_items"])]),
+        ("mcp_embedding_cache_disk_evictions_total", "counter", "디스크 캐시에서 만료/용량 초과로 지운 임베딩 수",
+         [({}, cache["disk_evictions"])]),
+        ("mcp_embedding_cache_dropped_writes_total", "counter", "디스크 쓰기가 밀려 버린 임베딩 수",
+         [({}, cache["dropped_writes"])]),
+        ("mcp_embedding_batches_total", "counter", "배처가 보낸 임베딩 배치 호출 수", [({}, embedding_batcher.batches)]),
+        ("mcp_embedding_batch_items_total", "counter", "배처가 보낸 임베딩 텍스트 수", [({}, embedding_batcher.items)]),
+    ]
+
+metrics.registry.register_collector(_embedding_metrics)
+
+def _result_cache_metrics():
+    """추천 결과 캐시의 조회 결과와 항목 수를 /metrics에 노출합니다."""
+    cache = result_cache.stats()
+    return [
+        ("mcp_result_cache_lookups_total", "counter", "추천 결과 캐시 조회 결과별 수", [
+            ({"result": "hit"}, cache["hits"]),
+            ({"result": "miss"}, cache["misses"]),
+        ]),
+        ("mcp_result_cache_removals_total", "counter", "추천 결과 캐시에서 빠진 항목 수", [
+            ({"reason": "expired"}, cache["expired"]),
+            ({"reason": "evicted"}, cache["evictions"]),
+        ]),
+        ("mcp_result_cache_items", "gauge", "추천 결과 캐시 항목 수", [({}, cache["items"])]),
+    ]
+
+metrics.registry.register_collector(_result_cache_metrics)
+
+def _semantic_cache_metrics():
+    """시맨틱 캐시의 조회 결과와 항목 수/메모리를 /metrics에 노출합니다. (유사도 분포는 mcp_semantic_cache_similarity)"""
+    cache = semantic_cache.stats()
+    return [
+        ("mcp_semantic_cache_lookups_total", "counter", "시맨틱 캐시 조회 결과별 수 (feature_hit: 상위 feature만 재사용)", [
+            ({"result": "hit"}, cache["hits"]),
+            ({"result": "feature_hit"}, cache["feature_hits"]),
+            ({"result": "miss"}, cache["misses"]),
+        ]),
+        ("mcp_semantic_cache_evictions_total", "counter", "시맨틱 캐시에서 덮어쓴 항목 수", [({}, cache["evictions"])]),
+        ("mcp_semantic_cache_items", "gauge", "시맨틱 캐시 항목 수", [({}, cache["items"])]),
+        ("mcp_semantic_cache_bytes", "gauge", "시맨틱 캐시 임베딩 행렬 크기", [({}, cache["bytes"])]),
+    ]
+
+metrics.registry.register_collector(_semantic_cache_metrics)
+
+async def get_embedding_async(text: str) -> List[float]:
+    """get_embedding의 비동기 버전. 동시에 들어온 쿼리들은 하나의 배치 호출로 묶입니다."""
+    cached = await embedding_cache.get_async(text, EMBEDDING_MODEL)
+    if cached is not None:
+        return cached
     try:
-        response = client.embeddings.create(
-            model="embedding-passage",
-            input=[text]
-        )
-        return response.data[0].embedding
+        # 동시에 들어온 다른 쿼리들과 묶어서 한 번에 요청
+        embedding = await embedding_batcher.embed(text)
     except Exception as e:
         print(f"Error getting embedding for text: {e}")
         return []
+    embedding_cache.put(text, EMBEDDING_MODEL, embedding)
+    return embedding
 
-def load_saved_data() -> Tuple[Dict, Dict]:
+def load_saved_data(data_dir: str = data_dir) -> Tuple[Dict, Dict]:
     """저장된 데이터를 불러옵니다."""
     # example_sentences.json 파일에서 문장들 불러오기
     with open(os.path.join(data_dir, 'example_sentences.json'), 'r', encoding='utf-8') as f:
@@ -42,28 +215,98 @@ def load_saved_data() -> Tuple[Dict, Dict]:
         feature_embeddings = json.load(f)
     return feature_sentences, feature_embeddings
 
-def find_similar_sentences(query: str, feature_sentences: Dict, feature_embeddings: Dict, top_k: int = 50) -> List[Tuple[str, str, float]]:
-    """쿼리와 유사한 문장들을 찾습니다."""
+def load_similarity_engine(data_dir: str = data_dir, feature_sentences: Optional[Dict] = None) -> FeatureSimilarityEngine:
+    """
+    유사도 엔진을 불러옵니다. 바이너리 임베딩 아티팩트(feature_embeddings.npy + manifest)가 있으면
+    mmap으로 열고, 없으면 feature_embeddings.json을 파싱해 만듭니다.
+    """
+    if feature_sentences is None:
+        with open(os.path.join(data_dir, 'example_sentences.json'), 'r', encoding='utf-8') as f:
+            feature_sentences = json.load(f)
+    matrix_path = os.path.join(data_dir, EMBEDDING_ARTIFACT)
+    manifest_path = os.path.join(data_dir, EMBEDDING_MANIFEST)
+    engine = None
+    if os.path.exists(matrix_path) and os.path.exists(manifest_path):
+        try:
+            engine = FeatureSimilarityEngine.from_artifact(matrix_path, manifest_path, feature_sentences)
+        except Exception as e:
+            print(f"Failed to load embedding artifact, falling back to JSON: {e}")
+    if engine is None:
+        with open(os.path.join(data_dir, 'feature_embeddings.json'), 'r', encoding='utf-8') as f:
+            feature_embeddings = json.load(f)
+        engine = FeatureSimilarityEngine(feature_sentences, feature_embeddings)
+    if engine.model is None:
+        print(f"Warning: the model that built the example embeddings is unknown, make sure it is {EMBEDDING_MODEL}")
+    elif engine.model != EMBEDDING_MODEL:
+        print(f"Warning: example embeddings were built with {engine.model}, queries use {EMBEDDING_MODEL}")
+    attach_sentence_index(engine, data_dir)
+    return engine
+
+def attach_sentence_index(engine: FeatureSimilarityEngine, data_dir: str = data_dir):
+    """예시 문장 검색 인덱스가 있으면 엔진에 붙입니다. (없거나 엔진의 임베딩으로 만든 것이 아니면 전수 탐색)"""
+    index_dir = os.path.join(data_dir, SENTENCE_INDEX_DIR)
+    if os.path.exists(os.path.join(index_dir, 'manifest.json')):
+        try:
+            engine.index = load_sentence_index(index_dir, engine.matrix)
+        except Exception as e:
+            print(f"Failed to load sentence index, using exact search: {e}")
+
+def load_catalog(data_dir: str = data_dir) -> "pd.DataFrame":
+    """Spotify 곡 카탈로그 CSV를 불러옵니다. (pandas는 CSV를 파싱할 때만 import)"""
+    import pandas as pd
+    csv_path = os.path.join(data_dir, "spotify_tracknames_updated.csv")
+    return pd.read_csv(csv_path)
+
+def load_track_store(data_dir: str = data_dir) -> TrackStore:
+    """
+    곡 카탈로그를 열 단위 TrackStore로 불러옵니다.
+    build_track_catalog.py로 만든 바이너리 카탈로그가 있으면 mmap으로 열고, 없으면 CSV를 파싱합니다.
+    """
+    catalog_dir = os.path.join(data_dir, TRACK_CATALOG_DIR)
+    if os.path.exists(os.path.join(catalog_dir, 'manifest.json')):
+        try:
+            return TrackStore.load(catalog_dir)
+        except Exception as e:
+            print(f"Failed to load track catalog artifact, falling back to CSV: {e}")
+    return TrackStore.from_dataframe(load_catalog(data_dir))
+
+# 같은 데이터 dict에 대해 엔진을 반복 생성하지 않도록 마지막으로 만든 엔진을 보관
+_engine_cache = None
+
+def get_similarity_engine(feature_sentences: Dict, feature_embeddings: Dict) -> FeatureSimilarityEngine:
+    """
+    feature 데이터로 유사도 엔진을 만들거나, 같은 dict로 만든 엔진이 있으면 재사용합니다.
+    저장된 예시 문장 검색 인덱스가 같은 임베딩으로 만든 것이면 함께 붙입니다.
+    """
+    global _engine_cache
+    cached = _engine_cache
+    if cached is not None and cached[0] is feature_sentences and cached[1] is feature_embeddings:
+        return cached[2]
+    engine = FeatureSimilarityEngine(feature_sentences, feature_embeddings)
+    attach_sentence_index(engine)
+    _engine_cache = (feature_sentences, feature_embeddings, engine)
+    return engine
+
+def find_similar_sentences(query: str, feature_sentences: Dict, feature_embeddings: Dict, top_k: int = 50,
+                           engine: Optional[FeatureSimilarityEngine] = None) -> List[Tuple[str, str, float]]:
+    """
+    쿼리와 유사한 문장들을 찾습니다.
+    engine: 미리 만들어 둔 유사도 엔진 (문장 인덱스가 붙어 있으면 인덱스로 검색)
+    """
     # 쿼리 임베딩
     query_embedding = get_embedding(query)
     if not query_embedding:
         return []
     
-    all_similarities = []
+    if engine is None:
+        engine = get_similarity_engine(feature_sentences, feature_embeddings)
     
-    # 각 feature별로 유사도 계산
-    for feature, embeddings in feature_embeddings.items():
-        sentences = feature_sentences[feature]
-        
-        for i, embedding in enumerate(embeddings):
-            # 코사인 유사도 계산
-            similarity = cosine_similarity([query_embedding], [embedding])[0][0]
-            all_similarities.append((feature, sentences[i], similarity))
-    
-    # 유사도가 높은 순으로 정렬
-    all_similarities.sort(key=lambda x: x[2], reverse=True)
-    
-    return all_similarities[:top_k]
+    # 전체 예시 문장 중 유사도가 높은 순으로 top_k개 선택
+    rows, similarities = engine.search(query_embedding, top_k)
+    return [
+        (engine.row_features[row], engine.sentences[row], float(similarity))
+        for row, similarity in zip(rows, similarities)
+    ]
 
 def calculate_feature_scores_with_examples(query: str, feature_sentences: Dict, feature_embeddings: Dict) -> List[Tuple[str, float, List[Tuple[str, float]]]]:
     """쿼리 문장의 각 feature별 점수와 top 3 예시 문장 및 유사도를 반환합니다."""
@@ -72,21 +315,14 @@ def calculate_feature_scores_with_examples(query: str, feature_sentences: Dict,
     if not query_embedding:
         return []
     
+    engine = get_similarity_engine(feature_sentences, feature_embeddings)
+    similarities = engine.query_similarities(query_embedding)
     feature_scores = []
     
     # 각 feature별로 유사도가 높은 문장 3개의 평균 계산 및 예시 반환
-    for feature, embeddings in feature_embeddings.items():
-        similarities = []
-        sentences = feature_sentences[feature]
-        
-        for i, embedding in enumerate(embeddings):
-            similarity = cosine_similarity([query_embedding], [embedding])[0][0]
-            similarities.append((sentences[i], similarity))
-        
-        # 유사도가 높은 순으로 정렬하고 상위 3개만 선택
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        top_3 = similarities[:3]
-        avg_similarity = np.mean([sim for _, sim in top_3])
+    for feature in engine.features:
+        top_3 = [(engine.sentences[row], float(similarities[row])) for row in engine.top_n(similarities, feature, 3)]
+        avg_similarity = float(np.mean([sim for _, sim in top_3]))
         feature_scores.append((feature, avg_similarity, top_3))
     
     # 유사도가 높은 순으로 정렬
@@ -94,40 +330,72 @@ def calculate_feature_scores_with_examples(query: str, feature_sentences: Dict,
     
     return feature_scores
 
-def calculate_feature_sim_high_low(query: str, feature_sentences: Dict, feature_embeddings: Dict, n_avg: int = 5) -> Dict[str, Tuple[float, float]]:
+def calculate_feature_sim_high_low(query: str, feature_sentences: Dict, feature_embeddings: Dict, n_avg: int = 5, engine: Optional[FeatureSimilarityEngine] = None,
+                                   mode: str = "topn") -> Dict[str, Tuple[float, float]]:
     """
     각 feature별로 쿼리와 '높다'/'낮다' 예시 임베딩의 평균과의 유사도(sim_high, sim_low)를 반환.
     n_avg: 상위 n개 예시의 평균 유사도 사용
+    engine: 미리 만들어 둔 유사도 엔진 (없으면 feature 데이터로 생성)
+    mode: "topn"(상위 n_avg개 평균) 또는 "centroid"(뱅크 centroid와의 유사도)
     반환: {feature: (sim_high, sim_low)}
     """
     query_embedding = get_embedding(query)
     if not query_embedding:
         return {}
+    if engine is None:
+        engine = get_similarity_engine(feature_sentences, feature_embeddings)
+    return feature_sim_from_embedding(query_embedding, engine, n_avg=n_avg, mode=mode)
+
+def feature_sim_from_embedding(query_embedding, engine: FeatureSimilarityEngine, n_avg: int = 5,
+                               mode: str = "topn") -> Dict[str, Tuple[float, float]]:
+    """
+    이미 구한 쿼리 임베딩으로 feature별 (sim_high, sim_low)를 계산합니다.
+    mode: "topn"은 뱅크별 상위 n_avg개 예시 유사도의 평균, "centroid"는 미리 계산한 뱅크 centroid와의 유사도
+    """
+    if mode == "centroid":
+        return feature_sims_from_embeddings([query_embedding], engine, n_avg, mode)[0]
+    # 18개 뱅크 전체와의 유사도를 한 번에 계산
+    similarities = engine.query_similarities(query_embedding)
     feature_sim = {}
-    for feature in [
-        'danceability', 'energy', 'loudness', 'speechiness',
-        'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo']:
-        # high
+    for feature in AUDIO_FEATURES:
         high_key = f"{feature}_high"
         low_key = f"{feature}_low"
-        if high_key not in feature_sentences or low_key not in feature_sentences:
+        if not engine.has_feature(high_key) or not engine.has_feature(low_key):
             continue
-        high_embeddings = feature_embeddings[high_key]
-        low_embeddings = feature_embeddings[low_key]
-        # 각 예시 임베딩과 쿼리 임베딩의 유사도 계산
-        sim_highs = [cosine_similarity([query_embedding], [emb])[0][0] for emb in high_embeddings]
-        sim_lows = [cosine_similarity([query_embedding], [emb])[0][0] for emb in low_embeddings]
         # 상위 n개 평균
-        sim_highs.sort(reverse=True)
-        sim_lows.sort(reverse=True)
-        sim_high = np.mean(sim_highs[:n_avg])
-        sim_low = np.mean(sim_lows[:n_avg])
+        sim_high = engine.top_mean(similarities, high_key, n_avg)
+        sim_low = engine.top_mean(similarities, low_key, n_avg)
         feature_sim[feature] = (sim_high, sim_low)
     return feature_sim
 
-def recommend_tracks(query: str, top_k: int = 20):
-    feature_sentences, feature_embeddings = load_saved_data()
-    feature_sim = calculate_feature_sim_high_low(query, feature_sentences, feature_embeddings, n_avg=5)
+def feature_sims_from_embeddings(query_embeddings: List[List[float]], engine: FeatureSimilarityEngine, n_avg: int = 5,
+                                 mode: str = "topn") -> List[Dict[str, Tuple[float, float]]]:
+    """여러 쿼리 임베딩의 feature별 (sim_high, sim_low)를 한 번의 행렬-행렬 곱으로 계산합니다. (빈 임베딩은 {})"""
+    if mode not in FEATURE_MODES:
+        raise ValueError(f"unknown feature mode: {mode}")
+    valid = [i for i, embedding in enumerate(query_embeddings) if len(embedding)]
+    feature_sims = [{} for _ in query_embeddings]
+    if not valid:
+        return feature_sims
+    if mode == "centroid":
+        similarities = engine.centroid_similarities([query_embeddings[i] for i in valid])
+        bank_score = engine.centroid_score
+    else:
+        similarities = engine.batch_similarities([query_embeddings[i] for i in valid])
+        bank_score = lambda sims, feature: engine.top_mean_batch(sims, feature, n_avg)
+    for feature in AUDIO_FEATURES:
+        high_key = f"{feature}_high"
+        low_key = f"{feature}_low"
+        if not engine.has_feature(high_key) or not engine.has_feature(low_key):
+            continue
+        sim_highs = bank_score(similarities, high_key)
+        sim_lows = bank_score(similarities, low_key)
+        for j, i in enumerate(valid):
+            feature_sims[i][feature] = (float(sim_highs[j]), float(sim_lows[j]))
+    return feature_sims
+
+def select_top_features(feature_sim: Dict[str, Tuple[float, float]], n: int = 3) -> List[Tuple[str, float, str]]:
+    """feature별 (sim_high, sim_low)에서 관련도가 높은 상위 n개 feature와 방향(high/low)을 고릅니다."""
     feature_relevance = []
     for feature, (sim_high, sim_low) in feature_sim.items():
         if sim_high > sim_low:
@@ -135,7 +403,378 @@ def recommend_tracks(query: str, top_k: int = 20):
         else:
             feature_relevance.append((feature, sim_low, 'low'))
     feature_relevance.sort(key=lambda x: x[1], reverse=True)
-    top_features = feature_relevance[:3]
+    return feature_relevance[:n]
+
+def rank_tracks(store: TrackStore, top_features: List[Tuple[str, float, str]], top_k: int = 20,
+                languages: Optional[List[str]] = None, min_popularity: float = DEFAULT_MIN_POPULARITY) -> List[Dict]:
+    """
+    상위 feature 기반 점수로 카탈로그를 정렬하고, 제목/아티스트 중복을 제거한 top_k곡을 반환합니다.
+    languages, min_popularity: 추천 대상 곡의 언어 목록과 최소 popularity (점수 계산 전에 적용)
+    """
+    return list(iter_rank_tracks(store, top_features, top_k, languages, min_popularity))
+
+def iter_rank_tracks(store: TrackStore, top_features: List[Tuple[str, float, str]], top_k: int = 20,
+                     languages: Optional[List[str]] = None, min_popularity: float = DEFAULT_MIN_POPULARITY) -> Iterator[Dict]:
+    """rank_tracks와 같은 곡을 같은 순서로, 중복 제거에서 고르는 즉시 하나씩 돌려줍니다. (스트리밍 응답용)"""
+    if languages is None:
+        languages = DEFAULT_LANGUAGES
+    with metrics.stage("filter"):
+        use_ranking_index = _use_ranking_index(store, top_k, languages, min_popularity)
+    if use_ranking_index:
+        yield from _iter_rank_tracks_threshold(store, top_features, top_k, languages, min_popularity)
+        return
+    # 조건을 만족하는 곡(미리 나눠 둔 언어별 파티션의 popularity 상위 구간)만 점수 계산
+    with metrics.stage("scoring"):
+        rows, scores = store.score_eligible(top_features, languages, min_popularity)
+    # 점수 순으로 제목/아티스트 중복을 건너뛰며 top_k곡 선택
+    with metrics.stage("sort_dedup"):
+        for i in iter_unique_top_k(scores, store.title_ids, store.artist_ids, top_k, rows=rows):
+            yield store.track_info(rows[i], scores[i])
+
+def threshold_window(top_k: int) -> int:
+    """threshold algorithm이 처음 찾는 상위 곡 수 (중복 제거로 모자라면 4배씩 늘림)"""
+    return max(top_k * 4, 64)
+
+def _use_ranking_index(store: TrackStore, top_k: int, languages: List[str], min_popularity: float) -> bool:
+    """조건을 만족하는 구간의 평균 곡 수 / window가 RANKING_INDEX_MIN_RATIO 이상이면 threshold algorithm을 사용합니다."""
+    slices = store.eligible_slices(languages, min_popularity)
+    if not slices:
+        return False
+    eligible = sum(end - start for start, end in slices)
+    return eligible / len(slices) >= RANKING_INDEX_MIN_RATIO * threshold_window(top_k)
+
+def _iter_rank_tracks_threshold(store: TrackStore, top_features: List[Tuple[str, float, str]], top_k: int,
+                                languages: List[str], min_popularity: float) -> Iterator[Dict]:
+    """
+    iter_rank_tracks와 같은 결과를 전체 점수 계산 없이 구합니다. 점수 상위 window곡만 threshold algorithm으로 찾아
+    중복 제거하고, 중복이 많아 top_k곡을 못 채우면 window를 늘려 다시 찾습니다.
+    window를 늘려도 점수 순 앞부분은 같으므로 앞에서 고른 곡은 다시 고른 결과의 앞부분과 같고, 이미 보낸 곡은 건너뜁니다.
+    """
+    window = threshold_window(top_k)
+    sent = 0
+    while True:
+        with metrics.stage("scoring"):
+            rows, scores, complete = store.top_eligible(top_features, languages, min_popularity, window)
+        with metrics.stage("sort_dedup"):
+            for count, i in enumerate(iter_unique_top_k(scores, store.title_ids, store.artist_ids, top_k, rows=rows)):
+                if count >= sent:
+                    sent += 1
+                    yield store.track_info(rows[i], scores[i])
+            if sent >= top_k or complete:
+                return
+        window *= 4
+
+def rank_tracks_batch(store: TrackStore, top_features_list: List[List[Tuple[str, float, str]]], queries: List[Dict]) -> List[List[Dict]]:
+    """
+    여러 쿼리의 곡 추천을 한 번에 계산합니다. 같은 필터(언어, popularity)를 쓰는 쿼리끼리 묶어
+    행렬-행렬 곱으로 점수를 구하고, 점수 행렬이 너무 커지지 않도록 쿼리를 나눠 처리합니다.
+    queries: 쿼리별 {"top_k", "languages", "min_popularity"} (없는 값은 기본값)
+    """
+    groups = {}
+    for i, query in enumerate(queries):
+        # rank_tracks와 같은 규칙: 값이 없을 때만 기본 언어 (빈 목록이면 대상 곡 없음)
+        languages = query.get("languages")
+        if languages is None:
+            languages = DEFAULT_LANGUAGES
+        min_popularity = query.get("min_popularity", DEFAULT_MIN_POPULARITY)
+        groups.setdefault((tuple(languages), min_popularity), []).append(i)
+    results = [[] for _ in queries]
+    for (languages, min_popularity), members in groups.items():
+        with metrics.stage("filter"):
+            eligible = store.eligible_count(list(languages), min_popularity)
+        chunk_size = max(1, BATCH_SCORE_BUDGET // max(1, eligible))
+        for c in range(0, len(members), chunk_size):
+            chunk = members[c:c + chunk_size]
+            with metrics.stage("scoring"):
+                rows, scores = store.score_eligible_batch([top_features_list[i] for i in chunk], list(languages), min_popularity)
+            with metrics.stage("sort_dedup"):
+                for j, i in enumerate(chunk):
+                    top_k = queries[i].get("top_k", 20)
+                    picked = select_unique_top_k(scores[j], store.title_ids, store.artist_ids, top_k, rows=rows)
+                    results[i] = [store.track_info(rows[p], scores[j, p]) for p in picked]
+    return results
+
+def recommend_tracks(query: str, top_k: int = 20, state=None,
+                     languages: Optional[List[str]] = None, min_popularity: float = DEFAULT_MIN_POPULARITY,
+                     feature_mode: str = "topn"):
+    """
+    쿼리에 맞는 곡을 추천합니다.
+    state: 미리 로드해 둔 RecommendationState (없으면 데이터 파일을 직접 읽음)
+    languages, min_popularity: 추천 대상 곡의 언어 목록과 최소 popularity
+    feature_mode: feature 유사도 계산 방식 ("topn" 또는 "centroid")
+    state가 있으면 같은 데이터 버전에서 같은 쿼리/파라미터로 구한 결과를 캐시에서 바로 반환합니다.
+    """
+    key = _result_key(state, query, top_k, languages, min_popularity, feature_mode)
+    if key is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+    with metrics.stage("embedding"):
+        query_embedding = get_embedding(query)
+    top_features, results = _recommend_with_features(query_embedding, top_k, state, languages, min_popularity, feature_mode)
+    if key is not None and query_embedding:
+        result_cache.put(key, results, top_features)
+    return results
+
+async def recommend_tracks_async(query: str, top_k: int = 20, state=None,
+                                 languages: Optional[List[str]] = None, min_popularity: float = DEFAULT_MIN_POPULARITY,
+                                 feature_mode: str = "topn"):
+    """recommend_tracks의 비동기 버전. 임베딩은 비동기 클라이언트로 받고, 점수 계산은 별도 스레드에서 실행합니다."""
+    key = _result_key(state, query, top_k, languages, min_popularity, feature_mode)
+    if key is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+    with metrics.stage("embedding"):
+        query_embedding = await get_embedding_async(query)
+    # 점수 계산(CPU 작업)이 이벤트 루프를 막지 않도록 스레드로 넘김
+    top_features, results = await asyncio.to_thread(
+        _recommend_with_features, query_embedding, top_k, state, languages, min_popularity, feature_mode)
+    if key is not None and query_embedding:
+        result_cache.put(key, results, top_features)
+    return results
+
+async def recommend_tracks_stream(query: str, top_k: int = 20, state=None,
+                                  languages: Optional[List[str]] = None, min_popularity: float = DEFAULT_MIN_POPULARITY,
+                                  feature_mode: str = "topn") -> AsyncIterator[Dict]:
+    """
+    recommend_tracks_async의 스트리밍 버전. 곡 순위를 계산하기 전에 상위 feature와 방향을 먼저 보내고,
+    곡은 점수 계산 후 중복 제거가 한 곡씩 고르는 즉시 순위 순서대로 보냅니다.
+    yield: {"type": "features", "features": [{"feature", "direction", "relevance"}]}
+           -> {"type": "track", "rank": 순위(0부터), "track": TrackInfo dict} x 곡 수
+           -> {"type": "done", "count": 곡 수}
+    """
+    key = _result_key(state, query, top_k, languages, min_popularity, feature_mode)
+    entry = result_cache.get_entry(key, require_features=True) if key is not None else None
+    if entry is not None:
+        # 결과 캐시 적중 (상위 feature도 함께 저장된 경우만 적중으로 셈)
+        results, top_features = entry
+        yield _features_event(top_features)
+        for rank, track in enumerate(results):
+            yield {"type": "track", "rank": rank, "track": track}
+        yield {"type": "done", "count": len(results)}
+        return
+    with metrics.stage("embedding"):
+        query_embedding = await get_embedding_async(query)
+    engine, store = await asyncio.to_thread(_engine_and_store, state)
+    top_features, lookup = await asyncio.to_thread(
+        _resolve_top_features, query_embedding, engine, state, top_k, languages, min_popularity, feature_mode)
+    yield _features_event(top_features)
+    if lookup[4] is not None:
+        # 시맨틱 캐시에 같은 필터의 곡 목록이 있음
+        results = lookup[4]
+        for rank, track in enumerate(results):
+            yield {"type": "track", "rank": rank, "track": track}
+    else:
+        results = []
+        async for track in _iter_in_thread(iter_rank_tracks, store, top_features, top_k, languages, min_popularity):
+            yield {"type": "track", "rank": len(results), "track": track}
+            results.append(track)
+        _semantic_store(lookup, query_embedding, top_features, results)
+    if key is not None and query_embedding:
+        result_cache.put(key, results, top_features)
+    yield {"type": "done", "count": len(results)}
+
+async def _iter_in_thread(generate: Callable[..., Iterator], *args) -> AsyncIterator:
+    """
+    동기 generator generate(*args)를 스레드에서 돌리며, 값이 나오는 즉시 이벤트 루프 쪽으로 넘겨줍니다.
+    받는 쪽이 중간에 끊으면(클라이언트 연결 종료) 다음 값에서 멈추고, generator의 예외는 받는 쪽에서 다시 발생합니다.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def produce():
+        try:
+            for item in generate(*args):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    task = asyncio.ensure_future(asyncio.to_thread(produce))
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            yield item
+        await task
+    finally:
+        stop.set()
+        # 받는 쪽이 먼저 끊은 경우 스레드에서 난 예외를 조용히 회수
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+def _features_event(top_features: List[Tuple[str, float, str]]) -> Dict:
+    return {
+        "type": "features",
+        "features": [
+            {"feature": feature, "direction": direction, "relevance": float(relevance)}
+            for feature, relevance, direction in top_features
+        ],
+    }
+
+def recommend_tracks_batch(queries: List[Dict], state=None) -> List[List[Dict]]:
+    """
+    여러 쿼리를 한 번에 추천합니다. 임베딩은 한 번의 API 호출로 받습니다.
+    queries: 쿼리별 {"query", "top_k", "languages", "min_popularity", "feature_mode"}
+    결과 캐시에 있는 쿼리는 건너뛰고 나머지만 임베딩/점수 계산합니다.
+    """
+    keys, results, missing = _cached_batch_results(queries, state)
+    if missing:
+        with metrics.stage("embedding"):
+            query_embeddings = get_embeddings([queries[i]["query"] for i in missing])
+        computed = _recommend_batch_with_features(query_embeddings, [queries[i] for i in missing], state)
+        _fill_batch_results(keys, results, missing, query_embeddings, computed)
+    return results
+
+async def recommend_tracks_batch_async(queries: List[Dict], state=None) -> List[List[Dict]]:
+    """recommend_tracks_batch의 비동기 버전."""
+    keys, results, missing = _cached_batch_results(queries, state)
+    if missing:
+        with metrics.stage("embedding"):
+            query_embeddings = await get_embeddings_async([queries[i]["query"] for i in missing])
+        computed = await asyncio.to_thread(
+            _recommend_batch_with_features, query_embeddings, [queries[i] for i in missing], state)
+        _fill_batch_results(keys, results, missing, query_embeddings, computed)
+    return results
+
+def _result_key(state, query: str, top_k: int, languages: Optional[List[str]], min_popularity: float,
+                feature_mode: str) -> Optional[Tuple]:
+    """결과 캐시 키. 데이터 버전을 알 수 없는 경우(state 없음)나 캐시를 끈 경우 None."""
+    if state is None or not result_cache.enabled:
+        return None
+    return result_key(query, top_k, languages if languages is not None else DEFAULT_LANGUAGES,
+                      min_popularity, feature_mode, state.version)
+
+def _cached_batch_results(queries: List[Dict], state=None) -> Tuple[List[Optional[Tuple]], List[Optional[List[Dict]]], List[int]]:
+    """배치 쿼리별 (캐시 키, 캐시된 결과 또는 None, 계산해야 할 쿼리 번호)."""
+    keys = [
+        _result_key(state, query["query"], query.get("top_k", 20), query.get("languages"),
+                    query.get("min_popularity", DEFAULT_MIN_POPULARITY), query.get("feature_mode", "topn"))
+        for query in queries
+    ]
+    results = [result_cache.get(key) if key is not None else None for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    return keys, results, missing
+
+def _fill_batch_results(keys: List[Optional[Tuple]], results: List[Optional[List[Dict]]], missing: List[int],
+                        query_embeddings: List[List[float]], computed: Tuple[List[List[Tuple[str, float, str]]], List[List[Dict]]]):
+    # 임베딩에 실패한 쿼리(feature 가중치 없는 결과)는 캐시하지 않음
+    for i, embedding, top_features, tracks in zip(missing, query_embeddings, *computed):
+        results[i] = tracks
+        if keys[i] is not None and embedding:
+            result_cache.put(keys[i], tracks, top_features)
+
+def recommend_batch_from_embeddings(query_embeddings: List[List[float]], queries: List[Dict], state=None) -> List[List[Dict]]:
+    return _recommend_batch_with_features(query_embeddings, queries, state)[1]
+
+def _recommend_batch_with_features(query_embeddings: List[List[float]], queries: List[Dict],
+                                   state=None) -> Tuple[List[List[Tuple[str, float, str]]], List[List[Dict]]]:
+    """recommend_batch_from_embeddings와 같지만 (쿼리별 상위 feature, 쿼리별 곡 목록)을 반환합니다."""
+    engine, store = _engine_and_store(state)
+    # 시맨틱 캐시에서 상위 feature(와 곡 목록)를 찾은 쿼리는 해당 계산을 건너뜀
+    semantic = [
+        _semantic_lookup(state, embedding, query.get("top_k", 20), query.get("languages"),
+                         query.get("min_popularity", DEFAULT_MIN_POPULARITY), query.get("feature_mode", "topn"))
+        for embedding, query in zip(query_embeddings, queries)
+    ]
+    top_features_list = [lookup[3] for lookup in semantic]
+    results = [lookup[4] for lookup in semantic]
+    # feature 유사도 계산 방식이 같은 쿼리끼리 묶어서 계산
+    with metrics.stage("feature_similarity"):
+        for mode in FEATURE_MODES:
+            members = [i for i, query in enumerate(queries)
+                       if top_features_list[i] is None and query.get("feature_mode", "topn") == mode]
+            if members:
+                sims = feature_sims_from_embeddings([query_embeddings[i] for i in members], engine, n_avg=5, mode=mode)
+                for i, feature_sim in zip(members, sims):
+                    top_features_list[i] = select_top_features(feature_sim)
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        ranked = rank_tracks_batch(store, [top_features_list[i] for i in pending], [queries[i] for i in pending])
+        for i, tracks in zip(pending, ranked):
+            results[i] = tracks
+            _semantic_store(semantic[i], query_embeddings[i], top_features_list[i], tracks)
+    return top_features_list, results
+
+def _semantic_lookup(state, query_embedding: List[float], top_k: int, languages: Optional[List[str]],
+                     min_popularity: float, feature_mode: str) -> Tuple:
+    """
+    시맨틱 캐시 조회. 반환: (group, params, 항목 핸들, top_features, 곡 목록)
+    캐시를 쓰지 않는 경우(state 없음, 캐시 꺼짐, 임베딩 실패) group은 None이고, 적중하지 않은 값은 None입니다.
+    """
+    if state is None or not semantic_cache.enabled or not len(query_embedding):
+        return None, None, None, None, None
+    group = (state.version, feature_mode)
+    params = (int(top_k), tuple(sorted(set(languages if languages is not None else DEFAULT_LANGUAGES))), float(min_popularity))
+    with metrics.stage("semantic_cache"):
+        handle, top_features, tracks, similarity = semantic_cache.lookup(query_embedding, group, params)
+    if similarity == similarity:  # 비교할 항목이 없으면 nan
+        metrics.semantic_similarity.observe(similarity)
+    return group, params, handle, top_features, tracks
+
+def _semantic_store(lookup: Tuple, query_embedding: List[float], top_features: List[Tuple[str, float, str]], tracks: List[Dict]):
+    """새로 계산한 결과를 시맨틱 캐시에 저장합니다. (상위 feature만 재사용했으면 해당 항목에 곡 목록만 추가)"""
+    group, params, handle = lookup[:3]
+    if group is None:
+        return
+    if handle is None:
+        semantic_cache.put(query_embedding, group, top_features, params, tracks)
+    else:
+        semantic_cache.add_tracks(handle, params, tracks)
+
+def _engine_and_store(state=None) -> Tuple[FeatureSimilarityEngine, TrackStore]:
+    """state가 있으면 그 엔진/카탈로그를, 없으면 데이터 파일에서 직접 만든 것을 반환합니다."""
+    if state is not None:
+        return state.engine, state.tracks
+    with metrics.stage("data_load"):
+        return load_similarity_engine(), load_track_store()
+
+def recommend_from_embedding(query_embedding: List[float], top_k: int = 20, state=None,
+                             languages: Optional[List[str]] = None, min_popularity: float = DEFAULT_MIN_POPULARITY,
+                             feature_mode: str = "topn"):
+    """
+    이미 구한 쿼리 임베딩으로 곡을 추천합니다. (임베딩에 실패해 비어 있으면 feature 가중치 없이 정렬)
+    시맨틱 캐시에 거의 같은 이전 쿼리가 있으면 그 상위 feature(같은 필터의 곡 목록이 있으면 곡 목록까지)를 재사용합니다.
+    """
+    return _recommend_with_features(query_embedding, top_k, state, languages, min_popularity, feature_mode)[1]
+
+def _recommend_with_features(query_embedding: List[float], top_k: int = 20, state=None,
+                             languages: Optional[List[str]] = None, min_popularity: float = DEFAULT_MIN_POPULARITY,
+                             feature_mode: str = "topn") -> Tuple[List[Tuple[str, float, str]], List[Dict]]:
+    """recommend_from_embedding과 같지만 (상위 feature, 곡 목록)을 반환합니다."""
+    engine, store = _engine_and_store(state)
+    top_features, lookup = _resolve_top_features(query_embedding, engine, state, top_k, languages, min_popularity, feature_mode)
+    results = _rank_resolved(store, top_features, lookup, query_embedding, top_k, languages, min_popularity)
+    return top_features, results
+
+def _resolve_top_features(query_embedding: List[float], engine: FeatureSimilarityEngine, state, top_k: int,
+                          languages: Optional[List[str]], min_popularity: float, feature_mode: str) -> Tuple[List[Tuple[str, float, str]], Tuple]:
+    """상위 feature를 시맨틱 캐시에서 찾거나 계산합니다. 반환: (상위 feature, 시맨틱 캐시 조회 결과)"""
+    lookup = _semantic_lookup(state, query_embedding, top_k, languages, min_popularity, feature_mode)
+    top_features = lookup[3]
+    if top_features is None:
+        top_features = _top_features_from_embedding(query_embedding, engine, feature_mode)
+    return top_features, lookup
+
+def _rank_resolved(store: TrackStore, top_features: List[Tuple[str, float, str]], lookup: Tuple, query_embedding: List[float],
+                   top_k: int, languages: Optional[List[str]], min_popularity: float) -> List[Dict]:
+    """시맨틱 캐시에 같은 필터의 곡 목록이 있으면 그대로, 없으면 순위를 계산해 캐시에 저장합니다."""
+    if lookup[4] is not None:
+        return lookup[4]
+    results = rank_tracks(store, top_features, top_k, languages=languages, min_popularity=min_popularity)
+    _semantic_store(lookup, query_embedding, top_features, results)
+    return results
+
+def _top_features_from_embedding(query_embedding: List[float], engine: FeatureSimilarityEngine,
+                                 feature_mode: str) -> List[Tuple[str, float, str]]:
+    """쿼리 임베딩의 feature별 유사도를 계산해 상위 feature와 방향을 고릅니다."""
+    with metrics.stage("feature_similarity"):
+        feature_sim = feature_sim_from_embedding(query_embedding, engine, n_avg=5, mode=feature_mode) if query_embedding else {}
+        top_features = select_top_features(feature_sim)
 
     # --- 터미널에 출력 ---
     print("\n[Feature별 유사도 (sim_high, sim_low)]")
@@ -146,59 +785,7 @@ def recommend_tracks(query: str, top_k: int = 20):
     for feature, relevance, direction in top_features:
         print(f"{feature}: {direction} (relevance={relevance:.4f})")
     # -------------------
-
-    csv_path = os.path.join(data_dir, "spotify_tracknames_updated.csv")
-    df = pd.read_csv(csv_path)
-
-    def get_normalized_value(row, feature):
-        value = row[feature]
-        if pd.isnull(value):
-            return 0
-        if feature == 'loudness':
-            return max(0, min(1, (float(value) + 45.92) / 46.672))
-        elif feature == 'tempo':
-            return max(0, min(1, float(value) / 232.198))
-        else:
-            return float(value)
-
-    def calc_track_score(row):
-        score = 0
-        for feature, relevance, direction in top_features:
-            value = get_normalized_value(row, feature)
-            if direction == 'high':
-                score += relevance * value
-            else:
-                score += relevance * (1 - value)
-        return score
-
-    df["recommend_score"] = df.apply(calc_track_score, axis=1)
-    if 'language' in df.columns:
-        df = df[df['language'].isin(['English', 'Korean'])]
-    if 'popularity' in df.columns:
-        df = df[df['popularity'] >= 20]
-    df_sorted = df.sort_values("recommend_score", ascending=False)
-    def get_title(row):
-        return row["track_name"] if "track_name" in row and pd.notnull(row["track_name"]) else row["name"] if "name" in row and pd.notnull(row["name"]) else "Unknown"
-    def get_artist(row):
-        return row["artist_name"] if "artist_name" in row and pd.notnull(row["artist_name"]) else row["artists"] if "artists" in row and pd.notnull(row["artists"]) else "Unknown"
-    df_top = df_sorted.head(500).copy()
-    df_top['__title__'] = df_top.apply(get_title, axis=1)
-    df_top = df_top.drop_duplicates(subset='__title__', keep='first')
-    df_top['__artist__'] = df_top.apply(get_artist, axis=1)
-    df_top = df_top.drop_duplicates(subset='__artist__', keep='first')
-    top_n = df_top.head(top_k)
-
-    results = []
-    for _, row in top_n.iterrows():
-        results.append({
-            "track_name": get_title(row),
-            "artist_name": get_artist(row),
-            "track_uri": row.get("track_url", None),
-            "recommend_score": row["recommend_score"],
-            "language": row.get("language", None),
-            "popularity": row.get("popularity", None)
-        })
-    return results
+    return top_features
 
 def main():
     # 저장된 데이터 로드
@@ -215,72 +802,21 @@ def main():
         print(f"[{feature}] sim_high: {sim_high:.4f}, sim_low: {sim_low:.4f}")
 
     # === 상위 3개 feature만 사용 ===
-    feature_relevance = []
-    for feature, (sim_high, sim_low) in feature_sim.items():
-        if sim_high > sim_low:
-            feature_relevance.append((feature, sim_high, 'high'))
-        else:
-            feature_relevance.append((feature, sim_low, 'low'))
-    feature_relevance.sort(key=lambda x: x[1], reverse=True)
-    top_features = feature_relevance[:3]
+    top_features = select_top_features(feature_sim)
     print("\n=== 추천에 사용된 상위 3개 feature 및 방향성 ===")
     for feature, relevance, direction in top_features:
         print(f"{feature}: {direction} (relevance={relevance:.4f})")
 
     # === 음악 추천 ===
     print("\n=== 쿼리 기반 음악 추천 Top 20 ===")
-    # 1. CSV 로드
-    csv_path = os.path.join(data_dir, "spotify_tracknames_updated.csv")
-    df = pd.read_csv(csv_path)
-
-    def get_normalized_value(row, feature):
-        value = row[feature]
-        if pd.isnull(value):
-            return 0
-        if feature == 'loudness':
-            return max(0, min(1, (float(value) + 45.92) / 46.672))
-        elif feature == 'tempo':
-            return max(0, min(1, float(value) / 232.198))
-        else:
-            return float(value)
-
-    def calc_track_score(row):
-        score = 0
-        for feature, relevance, direction in top_features:
-            value = get_normalized_value(row, feature)
-            if direction == 'high':
-                score += relevance * value
-            else:
-                score += relevance * (1 - value)
-        return score
-
-    df["recommend_score"] = df.apply(calc_track_score, axis=1)
-    # 언어가 영어(English) 또는 한국어(Korean)인 곡만, popularity 20 이상만 필터링
-    if 'language' in df.columns:
-        df = df[df['language'].isin(['English', 'Korean'])]
-    if 'popularity' in df.columns:
-        df = df[df['popularity'] >= 20]
-    df_sorted = df.sort_values("recommend_score", ascending=False)
-    # 충분히 많은 곡(500개)에서 제목+아티스트 기준 중복 제거 후 20개 추출
-    def get_title(row):
-        return row["track_name"] if "track_name" in row and pd.notnull(row["track_name"]) else row["name"] if "name" in row and pd.notnull(row["name"]) else "Unknown"
-    def get_artist(row):
-        return row["artist_name"] if "artist_name" in row and pd.notnull(row["artist_name"]) else row["artists"] if "artists" in row and pd.notnull(row["artists"]) else "Unknown"
-    df_top = df_sorted.head(500).copy()
-    df_top['__title__'] = df_top.apply(get_title, axis=1)
-    df_top = df_top.drop_duplicates(subset='__title__', keep='first')
-    df_top['__artist__'] = df_top.apply(get_artist, axis=1)
-    df_top = df_top.drop_duplicates(subset='__artist__', keep='first')
-    top_20 = df_top.head(20)
-
-    # 3. 추천 결과 출력 (곡명, 아티스트, 점수)
-    for idx, row in top_20.iterrows():
-        title = row["track_name"] if "track_name" in row else row["name"] if "name" in row else "Unknown"
-        artist = row["artist_name"] if "artist_name" in row else row["artists"] if "artists" in row else "Unknown"
-        score = row["recommend_score"]
-        lang = row["language"] if "language" in row else "?"
-        pop = row["popularity"] if "popularity" in row else "?"
-        print(f"{idx+1}. {title} - {artist} (추천 점수: {score:.4f}, 언어: {lang}, popularity: {pop})")
+    store = load_track_store()
+    top_20 = rank_tracks(store, top_features, top_k=20)
+
+    # 추천 결과 출력 (곡명, 아티스트, 점수)
+    for rank, track in enumerate(top_20, 1):
+        lang = track["language"] if track["language"] is not None else "?"
+        pop = track["popularity"] if track["popularity"] is not None else "?"
+        print(f"{rank}. {track['track_name']} - {track['artist_name']} (추천 점수: {track['recommend_score']:.4f}, 언어: {lang}, popularity: {pop})")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,242 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.embedding_cache import normalize_text
+
+# 시맨틱 캐시 적중 기준 코사인 유사도 (SEMANTIC_CACHE_THRESHOLD의 기본값)
+# semantic_cache_report.py로 잰 결과 0.95에서는 적중의 약 44%가 직접 계산한 곡 목록과 달라, 98%가 같은 0.99를 기본으로 사용
+DEFAULT_SEMANTIC_THRESHOLD = 0.99
+
+
+def result_key(query: str, top_k: int, languages: Optional[Sequence[str]], min_popularity: float,
+               feature_mode: str, version: str) -> Tuple:
+    """
+    추천 결과 캐시 키: (데이터 버전, 정규화된 쿼리, top_k, 언어 집합, 최소 popularity, feature 모드).
+    언어 목록은 순서와 중복을 무시합니다.
+    """
+    return (
+        version,
+        normalize_text(query),
+        int(top_k),
+        tuple(sorted(set(languages))) if languages is not None else None,
+        float(min_popularity),
+        feature_mode,
+    )
+
+
+class ResultCache:
+    """
+    /recommend 결과 캐시. 크기가 제한된 LRU이고, 항목은 ttl초가 지나면 만료됩니다.
+    max_items가 0 이하이면 아무것도 저장하지 않습니다.
+    """
+
+    def __init__(self, max_items: int = 1024, ttl: float = 300.0):
+        self.max_items = max_items
+        self.ttl = ttl
+        # 키 -> (만료 시각, 곡 목록, 상위 feature 또는 None)
+        self._items: "OrderedDict[Hashable, Tuple[float, List[Dict], Optional[list]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0
+
+    def get(self, key: Hashable) -> Optional[List[Dict]]:
+        """캐시된 곡 목록의 복사본을 반환합니다. (호출자가 결과를 바꿔도 캐시는 그대로)"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: Hashable, require_features: bool = False) -> Optional[Tuple[List[Dict], Optional[list]]]:
+        """
+        (곡 목록 복사본, 저장할 때 함께 넘긴 상위 feature 또는 None)
+        require_features=True이면 상위 feature 없이 저장된 항목은 쓸 수 없으므로 miss로 셉니다.
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] <= now:
+                del self._items[key]
+                self.expired += 1
+                item = None
+            if item is None or (require_features and item[2] is None):
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        return [dict(track) for track in item[1]], (list(item[2]) if item[2] is not None else None)
+
+    def put(self, key: Hashable, tracks: List[Dict], top_features: Optional[list] = None):
+        if not self.enabled:
+            return
+        item = (time.monotonic() + self.ttl, [dict(track) for track in tracks],
+                list(top_features) if top_features is not None else None)
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "items": len(self._items),
+            }
+
+
+class SemanticCache:
+    """
+    쿼리 임베딩이 거의 같은(코사인 유사도 threshold 이상) 이전 쿼리의 추천 결과를 재사용하는 캐시.
+    - 항목마다 정규화된 쿼리 임베딩, 상위 feature(top_features), 필터 파라미터별 곡 목록을 보관합니다.
+    - group(데이터 버전, feature 모드)이 같은 항목끼리만 비교합니다.
+    - 임베딩은 (max_items x dim) 행렬 하나에 보관하고, 한 번의 행렬-벡터 곱으로 가장 가까운 항목을 찾습니다.
+    - 가득 차면 가장 오래 쓰지 않은 항목을 덮어쓰고, ttl초가 지난 항목은 적중하지 않습니다.
+    max_items가 0 이하이면 아무것도 저장하지 않습니다.
+    """
+
+    def __init__(self, max_items: int = 1024, threshold: float = DEFAULT_SEMANTIC_THRESHOLD, ttl: float = 300.0,
+                 max_tracks_per_entry: int = 8):
+        self.max_items = max_items
+        self.threshold = threshold
+        self.ttl = ttl
+        # 항목 하나에 보관하는 필터 파라미터 조합(곡 목록) 수
+        self.max_tracks_per_entry = max_tracks_per_entry
+        self._matrix: Optional[np.ndarray] = None
+        self._groups = np.full(max(max_items, 0), -1, dtype=np.int64)
+        self._last_used = np.zeros(max(max_items, 0), dtype=np.float64)
+        self._expires = np.zeros(max(max_items, 0), dtype=np.float64)
+        # 항목별 [세대 번호, top_features, {파라미터: 곡 목록}]
+        self._entries: List[Optional[list]] = [None] * max(max_items, 0)
+        self._group_ids: Dict[Hashable, int] = {}
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.feature_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, embedding, group: Hashable, params: Hashable) -> Tuple[Optional[Tuple[int, int]], Optional[list], Optional[List[Dict]], float]:
+        """
+        가장 가까운 이전 쿼리를 찾습니다.
+        반환: (항목 핸들, top_features, 곡 목록, 최고 유사도)
+        - 유사도가 threshold 미만이면 핸들/top_features/곡 목록은 None
+        - top_features만 있고 params의 곡 목록이 없으면 곡 목록은 None (순위 계산 후 add_tracks로 추가)
+        최고 유사도는 비교할 항목이 없으면 nan입니다.
+        """
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            group_id = self._group_ids.get(group)
+            if vector is None or group_id is None or self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self.misses += 1
+                return None, None, None, float("nan")
+            n = self._size
+            candidates = (self._groups[:n] == group_id) & (self._expires[:n] > now)
+            if not candidates.any():
+                self.misses += 1
+                return None, None, None, float("nan")
+            similarities = self._matrix[:n] @ vector
+            similarities[~candidates] = -np.inf
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, None, None, similarity
+            self._last_used[slot] = now
+            generation, top_features, tracks = self._entries[slot]
+            cached = tracks.get(params)
+            if cached is None:
+                self.feature_hits += 1
+            else:
+                self.hits += 1
+                cached = [dict(track) for track in cached]
+            return (slot, generation), list(top_features), cached, similarity
+
+    def put(self, embedding, group: Hashable, top_features: list, params: Hashable, tracks: List[Dict]):
+        """새 쿼리의 top_features와 곡 목록을 저장합니다. (가득 차면 가장 오래 쓰지 않은 항목을 덮어씀)"""
+        if not self.enabled:
+            return
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                # 첫 저장 또는 임베딩 차원이 바뀐 경우(다른 모델) 새로 할당
+                self._matrix = np.zeros((self.max_items, vector.shape[0]), dtype=np.float32)
+                self._groups[:] = -1
+                self._entries = [None] * self.max_items
+                self._group_ids.clear()
+                self._size = 0
+            group_id = self._group_ids.setdefault(group, len(self._group_ids))
+            if self._size < self.max_items:
+                slot = self._size
+                self._size += 1
+            else:
+                # 만료된 항목이 있으면 그 자리를, 없으면 가장 오래 쓰지 않은 항목을 덮어씀
+                expired = self._expires <= now
+                slot = int(np.argmax(expired)) if expired.any() else int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._generation += 1
+            self._matrix[slot] = vector
+            self._groups[slot] = group_id
+            self._last_used[slot] = now
+            self._expires[slot] = now + self.ttl
+            self._entries[slot] = [self._generation, list(top_features), {params: [dict(track) for track in tracks]}]
+
+    def add_tracks(self, handle: Tuple[int, int], params: Hashable, tracks: List[Dict]):
+        """lookup으로 찾은 항목에 다른 필터 파라미터의 곡 목록을 추가합니다. (그 사이 항목이 교체됐으면 무시)"""
+        slot, generation = handle
+        with self._lock:
+            entry = self._entries[slot]
+            if entry is None or entry[0] != generation:
+                return
+            if params not in entry[2] and len(entry[2]) >= self.max_tracks_per_entry:
+                entry[2].pop(next(iter(entry[2])))
+            entry[2][params] = [dict(track) for track in tracks]
+
+    def clear(self):
+        with self._lock:
+            self._matrix = None
+            self._groups[:] = -1
+            self._entries = [None] * max(self.max_items, 0)
+            self._group_ids.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "feature_hits": self.feature_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "items": self._size,
+                "bytes": int(self._matrix.nbytes) if self._matrix is not None else 0,
+            }
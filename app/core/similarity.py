@@ -0,0 +1,260 @@
+import json
+import os
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+
+
+class FeatureSimilarityEngine:
+    """
+    feature별 예시 문장 임베딩(*_high / *_low 뱅크)을 하나의 L2 정규화 float32 행렬로 묶어
+    쿼리와의 코사인 유사도를 한 번의 행렬-벡터 곱으로 계산합니다.
+    """
+
+    def __init__(self, feature_sentences: Dict, feature_embeddings: Dict):
+        offsets = {}
+        blocks = []
+        start = 0
+        for feature, embeddings in feature_embeddings.items():
+            count = len(embeddings)
+            if count == 0:
+                continue
+            offsets[feature] = (start, start + count)
+            blocks.append(np.asarray(embeddings, dtype=np.float32))
+            start += count
+        if blocks:
+            matrix = np.ascontiguousarray(np.vstack(blocks), dtype=np.float32)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        self._setup(matrix, offsets, feature_sentences, normalized=False)
+
+    @classmethod
+    def from_artifact(cls, matrix_path: str, manifest_path: str, feature_sentences: Dict) -> "FeatureSimilarityEngine":
+        """
+        save_embeddings.py가 만든 바이너리 아티팩트(정규화된 float32 .npy + manifest JSON)로 엔진을 만듭니다.
+        행렬은 mmap으로 열어 복사하지 않으므로, 여러 워커 프로세스가 같은 페이지를 공유합니다.
+        """
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        matrix = np.load(matrix_path, mmap_mode='r')
+        if matrix.dtype != np.float32 or matrix.ndim != 2 or matrix.shape[1] != manifest['dim']:
+            raise ValueError(f"embedding artifact {matrix_path} does not match its manifest")
+        offsets = {feature: (int(start), int(end)) for feature, (start, end) in manifest['offsets'].items()}
+        engine = cls.__new__(cls)
+        engine._setup(matrix, offsets, feature_sentences, normalized=manifest.get('normalized', False))
+        engine.model = manifest.get('model')
+        centroids = manifest.get('centroids')
+        if centroids:
+            centroid_path = os.path.join(os.path.dirname(matrix_path), centroids['file'])
+            engine.centroids = np.load(centroid_path, mmap_mode='r')
+            engine.centroid_offsets = {feature: (int(start), int(end)) for feature, (start, end) in centroids['offsets'].items()}
+        return engine
+
+    def _setup(self, matrix: np.ndarray, offsets: Dict[str, Tuple[int, int]], feature_sentences: Dict, normalized: bool):
+        sentences = []
+        row_features = []
+        for feature, (start, end) in offsets.items():
+            count = end - start
+            bank = list(feature_sentences.get(feature, [])[:count])
+            sentences.extend(bank + [""] * (count - len(bank)))
+            row_features.extend([feature] * count)
+        self.features: List[str] = list(offsets)
+        self.offsets: Dict[str, Tuple[int, int]] = offsets
+        self.sentences: List[str] = sentences
+        self.row_features: List[str] = row_features
+        self.model = None
+        if not normalized:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = matrix / norms
+        self.matrix: np.ndarray = matrix
+        # centroid 모드용 뱅크별 대표 벡터 (아티팩트에 없으면 처음 사용할 때 뱅크 평균으로 계산)
+        self.centroids: Optional[np.ndarray] = None
+        self.centroid_offsets: Dict[str, Tuple[int, int]] = {}
+        # 전체 예시 문장 검색용 인덱스 (sentence_index.py, 없으면 전수 탐색)
+        self.index = None
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def has_feature(self, feature: str) -> bool:
+        return feature in self.offsets
+
+    def query_similarities(self, query_embedding) -> np.ndarray:
+        """쿼리 임베딩과 모든 예시 문장의 코사인 유사도 벡터(행 순서는 self.matrix와 동일)."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(self.matrix.shape[0], dtype=np.float32)
+        return self.matrix @ (query / norm)
+
+    def batch_similarities(self, query_embeddings) -> np.ndarray:
+        """여러 쿼리 임베딩과 모든 예시 문장의 유사도 행렬 (쿼리 수 x 문장 수)."""
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (queries / norms) @ self.matrix.T
+
+    def top_mean_batch(self, similarities: np.ndarray, feature: str, n: int) -> np.ndarray:
+        """batch_similarities 결과에서 쿼리마다 feature 뱅크 상위 n개 유사도의 평균."""
+        start, end = self.offsets[feature]
+        bank = similarities[:, start:end]
+        n = min(n, end - start)
+        top = -np.partition(-bank, n - 1, axis=1)[:, :n]
+        return top.mean(axis=1)
+
+    def _ensure_centroids(self):
+        if self.centroids is None:
+            self.centroids, self.centroid_offsets = compute_bank_centroids(self.matrix, self.offsets, k=1)
+
+    def centroid_similarities(self, query_embeddings) -> np.ndarray:
+        """
+        쿼리 임베딩(1개 또는 여러 개)과 뱅크 centroid들의 유사도.
+        뱅크 크기와 무관하게 쿼리당 (뱅크 수 x k)번의 내적만 필요합니다.
+        반환: (쿼리 수 x centroid 수)
+        """
+        self._ensure_centroids()
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (queries / norms) @ self.centroids.T
+
+    def centroid_score(self, similarities: np.ndarray, feature: str) -> np.ndarray:
+        """centroid_similarities 결과에서 쿼리마다 feature 뱅크의 부분 centroid 중 가장 가까운 것의 유사도."""
+        start, end = self.centroid_offsets[feature]
+        return similarities[:, start:end].max(axis=1)
+
+    def bank(self, similarities: np.ndarray, feature: str) -> np.ndarray:
+        """전체 유사도 벡터에서 특정 feature 뱅크 구간만 잘라 반환합니다."""
+        start, end = self.offsets[feature]
+        return similarities[start:end]
+
+    def top_n(self, similarities: np.ndarray, feature: str, n: int) -> np.ndarray:
+        """feature 뱅크 안에서 유사도 상위 n개의 (전체 행 기준) 인덱스를 내림차순으로 반환합니다."""
+        start, _ = self.offsets[feature]
+        local = _top_indices(self.bank(similarities, feature), n)
+        return local + start
+
+    def top_mean(self, similarities: np.ndarray, feature: str, n: int) -> float:
+        """feature 뱅크에서 상위 n개 유사도의 평균."""
+        rows = self.top_n(similarities, feature, n)
+        return float(similarities[rows].mean())
+
+    def top_overall(self, similarities: np.ndarray, k: int) -> np.ndarray:
+        """모든 뱅크를 통틀어 유사도 상위 k개의 행 인덱스를 내림차순으로 반환합니다."""
+        return _top_indices(similarities, k)
+
+    def search(self, query_embedding, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        모든 뱅크를 통틀어 쿼리와 가장 유사한 예시 문장 k개의 (행 인덱스, 유사도)를 내림차순으로 반환합니다.
+        문장 인덱스가 붙어 있으면 인덱스로, 없으면 전수 탐색으로 찾습니다.
+        """
+        if self.index is not None:
+            return self.index.search(query_embedding, k)
+        similarities = self.query_similarities(query_embedding)
+        rows = self.top_overall(similarities, k)
+        return rows, similarities[rows]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 25, seed: int = 0) -> np.ndarray:
+    """정규화된 벡터들을 코사인 유사도 기준으로 k개 군집으로 나눠 정규화된 centroid를 반환합니다."""
+    if k <= 1 or vectors.shape[0] <= 1:
+        return _normalize_rows(vectors.mean(axis=0, keepdims=True))
+    k = min(k, vectors.shape[0])
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(vectors.shape[0], k, replace=False)]
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        updated = centroids.copy()
+        for j in range(k):
+            members = vectors[assignment == j]
+            if members.shape[0]:
+                updated[j] = members.sum(axis=0)
+        updated = _normalize_rows(updated)
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+    return centroids
+
+
+def compute_bank_centroids(matrix: np.ndarray, offsets: Dict[str, Tuple[int, int]], k: int = 1) -> Tuple[np.ndarray, Dict[str, Tuple[int, int]]]:
+    """
+    뱅크(feature)마다 정규화된 평균 벡터(k=1) 또는 spherical k-means 부분 centroid k개를 계산합니다.
+    반환: (centroid 행렬, feature별 centroid 행 구간)
+    """
+    blocks = []
+    centroid_offsets = {}
+    start = 0
+    for feature, (bank_start, bank_end) in offsets.items():
+        bank = _normalize_rows(np.asarray(matrix[bank_start:bank_end], dtype=np.float32))
+        centroids = _spherical_kmeans(bank, k)
+        centroid_offsets[feature] = (start, start + centroids.shape[0])
+        blocks.append(centroids)
+        start += centroids.shape[0]
+    if not blocks:
+        return np.zeros((0, matrix.shape[1] if matrix.ndim == 2 else 0), dtype=np.float32), {}
+    return np.ascontiguousarray(np.vstack(blocks), dtype=np.float32), centroid_offsets
+
+
+def write_embedding_artifact(feature_embeddings: Dict, model: str, matrix_path: str, manifest_path: str,
+                             centroid_k: int = 1) -> Tuple[int, int]:
+    """
+    feature별 임베딩을 FeatureSimilarityEngine.from_artifact가 읽는 바이너리 아티팩트로 저장합니다.
+    행렬은 L2 정규화된 float32로 저장하고, manifest는 마지막에 써서 완성 여부를 나타냅니다.
+    centroid 모드용 뱅크별 centroid(centroid_k개씩)도 feature_centroids.npy로 함께 저장합니다.
+    반환: (행 수, 차원)
+    """
+    offsets = {}
+    blocks = []
+    start = 0
+    for feature, embeddings in feature_embeddings.items():
+        if len(embeddings) == 0:
+            continue
+        offsets[feature] = [start, start + len(embeddings)]
+        blocks.append(np.asarray(embeddings, dtype=np.float32))
+        start += len(embeddings)
+    matrix = np.vstack(blocks) if blocks else np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+    np.save(matrix_path, matrix)
+    centroids, centroid_offsets = compute_bank_centroids(
+        matrix, {feature: tuple(bounds) for feature, bounds in offsets.items()}, k=centroid_k)
+    centroid_file = "feature_centroids.npy"
+    np.save(os.path.join(os.path.dirname(matrix_path), centroid_file), centroids)
+    manifest = {
+        "model": model,
+        "dim": int(matrix.shape[1]),
+        "rows": int(matrix.shape[0]),
+        "dtype": "float32",
+        "normalized": True,
+        "offsets": offsets,
+        "centroids": {
+            "file": centroid_file,
+            "k": centroid_k,
+            "offsets": {feature: list(bounds) for feature, bounds in centroid_offsets.items()},
+        },
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return matrix.shape
+
+
+def _top_indices(values: np.ndarray, n: int) -> np.ndarray:
+    """argpartition으로 상위 n개를 고른 뒤 그 부분만 정렬합니다. (동점은 앞쪽 인덱스 우선)"""
+    size = values.shape[0]
+    n = min(n, size)
+    if n <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if n < size:
+        candidates = np.argpartition(-values, n - 1)[:n]
+    else:
+        candidates = np.arange(size)
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order]
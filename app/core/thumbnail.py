@@ -1,15 +1,27 @@
-from google import genai
-from google.genai import types
-from PIL import Image
 from io import BytesIO
-import base64
 import os
+import threading
 import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = genai.Client(api_key=os.environ["GOOGLE_API_KEY"])
+# google-genai / Pillow는 무겁고 선택 의존성이므로, 클라이언트는 처음 썸네일을 만들 때 생성합니다.
+# (GOOGLE_API_KEY가 없거나 패키지가 설치되지 않아도 서버는 시작되고, 썸네일 생성만 실패합니다)
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Gemini 클라이언트를 반환합니다. GOOGLE_API_KEY가 없으면 RuntimeError."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                raise RuntimeError("GOOGLE_API_KEY is not set")
+            from google import genai
+            _client = genai.Client(api_key=api_key)
+        return _client
 
 def extract_image_prompt_from_query(query: str) -> str:
     """
@@ -24,7 +36,8 @@ def extract_image_prompt_from_query(query: str) -> str:
     )
     full_prompt = f"{system_prompt}\n사용자 요청: {query}"
     try:
-        response = client.models.generate_content(
+        from google.genai import types
+        response = get_client().models.generate_content(
             model="gemini-2.5-flash",
             contents=full_prompt,
             config=types.GenerateContentConfig(response_modalities=['TEXT'])
@@ -50,7 +63,9 @@ def generate_thumbnail_from_query(query: str, save_dir: str = '.', prefix: str =
     image_prompt = extract_image_prompt_from_query(query)
     print(f"[LLM 프롬프트] 이미지 생성에 사용된 쿼리: {image_prompt}")
     try:
-        response = client.models.generate_content(
+        from google.genai import types
+        from PIL import Image
+        response = get_client().models.generate_content(
             model="gemini-2.0-flash-preview-image-generation",
             contents=image_prompt,
             config=types.GenerateContentConfig(
@@ -75,6 +90,7 @@ if __name__ == "__main__":
     path = generate_thumbnail_from_query(query)
     if path:
         print(f"썸네일 이미지가 생성되었습니다: {path}")
+        from PIL import Image
         img = Image.open(path)
         img.show()
     else:
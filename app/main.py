@@ -1,6 +1,32 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import recommend, thumbnail
+from app.api import health, metrics, recommend, thumbnail
+from app.core import recommendation
+from app.core.process_stats import format_bytes, memory_usage
+from app.core.state import RecommendationStateHolder
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 추천 데이터(예시 문장, 임베딩, 곡 카탈로그)를 서버 시작 시 한 번만 로드
+    app.state.recommendation = RecommendationStateHolder()
+    try:
+        app.state.recommendation.reload()
+    except Exception as e:
+        print(f"Failed to preload recommendation state: {e}")
+    memory = memory_usage()
+    print(f"[WORKER {os.getpid()}] RSS={format_bytes(memory['rss'])} "
+          f"(anon={format_bytes(memory['rss_anon'])}, file={format_bytes(memory['rss_file'])})")
+    # 다른 워커가 받은 /recommend/reload나 데이터 파일 교체를 이 워커도 반영하도록 변경을 주기적으로 확인
+    watcher = asyncio.create_task(app.state.recommendation.watch())
+    yield
+    watcher.cancel()
+    await recommendation.close_async_client()
+
+app = FastAPI(lifespan=lifespan)
+app.middleware("http")(metrics.metrics_middleware)
+app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(recommend.router)
 app.include_router(thumbnail.router)
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+운영용 서버 실행 스크립트 (--reload 없이 여러 워커로 실행)
+
+    python -m app.serve --workers 4
+
+워커들은 추천 데이터를 각자 파싱하지 않고 바이너리 아티팩트
+(feature_embeddings.npy, track_catalog/)를 mmap으로 열어 같은 메모리 페이지를 공유합니다.
+아티팩트가 없으면 워커를 띄우기 전에 부모 프로세스에서 한 번만 만듭니다.
+"""
+import argparse
+import json
+import os
+from typing import Optional
+
+import uvicorn
+
+
+def prepare_artifacts(data_dir: str, embedding_model: Optional[str] = None):
+    """
+    JSON/CSV만 있고 바이너리 아티팩트가 없으면 만들어 둡니다.
+    embedding_model: feature_embeddings.json을 만든 임베딩 모델 (JSON에는 기록되지 않으므로, 모르면 None으로 두고
+    서버가 로드할 때 경고를 냄)
+    """
+    from app.core import recommendation
+    from app.core.similarity import write_embedding_artifact
+
+    matrix_path = os.path.join(data_dir, recommendation.EMBEDDING_ARTIFACT)
+    manifest_path = os.path.join(data_dir, recommendation.EMBEDDING_MANIFEST)
+    json_path = os.path.join(data_dir, 'feature_embeddings.json')
+    if not os.path.exists(manifest_path) and os.path.exists(json_path):
+        print(f"[SERVE] Building embedding artifact from {json_path}")
+        with open(json_path, 'r', encoding='utf-8') as f:
+            feature_embeddings = json.load(f)
+        if embedding_model is None:
+            print("[SERVE] Embedding model of feature_embeddings.json is unknown (pass --embedding-model to record it)")
+        write_embedding_artifact(feature_embeddings, embedding_model, matrix_path, manifest_path)
+
+    catalog_dir = os.path.join(data_dir, recommendation.TRACK_CATALOG_DIR)
+    if not os.path.exists(os.path.join(catalog_dir, 'manifest.json')):
+        try:
+            print(f"[SERVE] Building track catalog artifact in {catalog_dir}")
+            recommendation.TrackStore.from_dataframe(recommendation.load_catalog(data_dir)).save(catalog_dir)
+        except FileNotFoundError as e:
+            print(f"[SERVE] Track catalog CSV not found, skipping: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Music Context Protocol API 운영 서버")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+    parser.add_argument("--skip-artifacts", action="store_true", help="바이너리 아티팩트를 만들지 않음")
+    parser.add_argument("--embedding-model", default=None,
+                        help="feature_embeddings.json을 만든 임베딩 모델 (아티팩트 manifest에 기록, 없으면 unknown)")
+    args = parser.parse_args()
+
+    if not args.skip_artifacts:
+        from app.core.recommendation import data_dir
+        prepare_artifacts(data_dir, args.embedding_model)
+
+    print(f"[SERVE] Starting {args.workers} worker(s) on {args.host}:{args.port}")
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, reload=False)
+
+
+if __name__ == "__main__":
+    main()
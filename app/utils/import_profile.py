@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# 서버 시작 경로에서 import되면 안 되는 무거운/선택 의존성 (처음 쓸 때 import)
+LAZY_MODULES = ["pandas", "openai", "httpx", "google.genai", "PIL", "sklearn"]
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """`python -X importtime` 출력을 (모듈, self us, cumulative us) 목록으로 바꿉니다."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """최상위 패키지별 self 시간 합계 (us)."""
+    totals: Dict[str, int] = {}
+    for name, self_us, _ in rows:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def profile(module: str, cwd: str) -> Dict:
+    """새 인터프리터에서 module을 import하고 걸린 시간과 불러온 모듈 목록을 잽니다."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = parse_importtime(completed.stderr)
+    loaded = {name for name, _, _ in rows}
+    return {
+        "module": module,
+        "wall_seconds": wall,
+        "import_seconds": sum(self_us for _, self_us, _ in rows) / 1e6,
+        "modules": len(rows),
+        "packages_ms": {package: us / 1000 for package, us in
+                        sorted(by_package(rows).items(), key=lambda item: -item[1])},
+        "lazy_loaded": [name for name in LAZY_MODULES if name in loaded],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="서버 모듈 import 시간(워커 콜드 스타트) 측정")
+    parser.add_argument("--module", default="app.main", help="import할 모듈")
+    parser.add_argument("--root", default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")),
+                        help="app 패키지가 있는 디렉터리")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (가장 빠른 결과를 사용)")
+    parser.add_argument("--top", type=int, default=15, help="출력할 패키지 수")
+    parser.add_argument("--strict", action="store_true", help="LAZY_MODULES가 import되면 종료 코드 1")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = [profile(args.module, args.root) for _ in range(max(args.repeat, 1))]
+    best = min(results, key=lambda result: result["import_seconds"])
+    print(f"import {args.module}: {best['import_seconds'] * 1000:.1f}ms "
+          f"(프로세스 전체 {best['wall_seconds'] * 1000:.1f}ms, 모듈 {best['modules']}개)")
+    for package, ms in list(best["packages_ms"].items())[:args.top]:
+        print(f"  {package:<30} {ms:8.1f}ms")
+    if best["lazy_loaded"]:
+        print(f"시작 시 import된 지연 로드 대상: {', '.join(best['lazy_loaded'])}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(best, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+    if args.strict and best["lazy_loaded"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import os
 import json
+import argparse
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from typing import Dict, List, Set
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Set, Optional, Tuple
+from urllib3.util.retry import Retry
 import time
 
 # .env 파일에서 API 키 로드
@@ -14,6 +19,54 @@ UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 SOLAR_API_URL = "https://api.upstage.ai/v1/solar/chat/completions"
 SOLAR_MODEL = "solar-pro-250422"
 
+FEATURES = [
+    'danceability', 'energy', 'loudness', 'speechiness',
+    'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo']
+FEATURE_CATEGORIES = ['음악적 특징', '감정적 특징', '상황적 특징']
+HIGHLOWS = ['높은', '낮은']
+
+# 동시 요청 수, 초당 최대 요청 수, 요청 타임아웃(초)
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 2.0
+REQUEST_TIMEOUT = 60
+# (feature, high/low, category)별 생성 결과를 저장해 두는 디렉터리 (중단 후 이어서 실행)
+CHECKPOINT_DIR = 'feature_descriptions_checkpoints'
+
+
+class RateLimiter:
+    """여러 스레드가 공유하는 요청 간격 제한기. 초당 rate개를 넘지 않도록 요청 시작 시각을 벌려 둡니다."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def make_session(pool_maxsize: int = MAX_WORKERS) -> requests.Session:
+    """
+    여러 스레드가 연결을 재사용하며 공유하는 Session. 연결 풀 크기는 동시 요청 수(pool_maxsize)에 맞춥니다.
+    429/5xx 응답과 연결 오류는 지수 backoff로 재시도하고, Retry-After 헤더가 있으면 그 시간만큼 기다립니다.
+    """
+    retry = Retry(total=5, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["POST"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=max(pool_maxsize, 1))
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Authorization": f"Bearer {UPSTAGE_API_KEY}",
+        "Content-Type": "application/json"
+    })
+    return session
+
 def get_feature_description(feature: str) -> str:
     """각 피처에 대한 설명을 반환합니다."""
     descriptions = {
@@ -50,16 +103,12 @@ def get_feature_description(feature: str) -> str:
     }
     return descriptions.get(feature, "")
 
-def generate_sentences_for_category(feature: str, category: str, highlow: str, count: int) -> List[str]:
-    """특정 카테고리와 high/low에 대한 문장들을 생성합니다."""
+def generate_sentences_for_category(feature: str, category: str, highlow: str, count: int,
+                                    session: requests.Session, rate_limiter: RateLimiter) -> List[str]:
+    """특정 카테고리와 high/low에 대한 문장들을 생성합니다. (session, rate_limiter는 동시에 실행하는 작업끼리 공유)"""
     feature_desc = get_feature_description(feature)
     prompt = f"""{feature_desc}\n\n{feature}가 {highlow} 음악의 {category}에 대한 짧은 문장 {count}개를 생성해주세요.\n각 문장은 이 음악의 특징, 분위기, 감정 중 하나를 간단히 설명하면 됩니다.\n문장은 짧고 명확해야 하며, 중복되지 않아야 합니다.\n각 문장은 새로운 줄에 작성해주세요."""
 
-    headers = {
-        "Authorization": f"Bearer {UPSTAGE_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     data = {
         "model": SOLAR_MODEL,
         "messages": [
@@ -71,7 +120,8 @@ def generate_sentences_for_category(feature: str, category: str, highlow: str, c
     }
 
     try:
-        response = requests.post(SOLAR_API_URL, headers=headers, json=data)
+        rate_limiter.wait()
+        response = session.post(SOLAR_API_URL, json=data, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         result = response.json()
         sentences = [s.strip() for s in result["choices"][0]["message"]["content"].strip().split('\n') if s.strip()]
@@ -80,31 +130,99 @@ def generate_sentences_for_category(feature: str, category: str, highlow: str, c
         print(f"Error generating sentences for {feature} - {category} - {highlow}: {e}")
         return []
 
-def generate_feature_descriptions() -> Dict[str, List[str]]:
-    """각 오디오 피처별로 high/low 예시 문장 30개씩 생성합니다."""
-    feature_categories = ['음악적 특징', '감정적 특징', '상황적 특징']
+def _checkpoint_path(checkpoint_dir: str, feature: str, highlow: str, category: str) -> str:
+    direction = 'high' if highlow == '높은' else 'low'
+    return os.path.join(checkpoint_dir, f"{feature}_{direction}_{FEATURE_CATEGORIES.index(category)}.json")
+
+def load_checkpoint(checkpoint_dir: str, feature: str, highlow: str, category: str) -> Optional[List[str]]:
+    """저장해 둔 생성 결과가 있으면 문장 리스트를, 없으면 None을 반환합니다."""
+    path = _checkpoint_path(checkpoint_dir, feature, highlow, category)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)["sentences"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+def save_checkpoint(checkpoint_dir: str, feature: str, highlow: str, category: str, sentences: List[str]):
+    """생성 결과 하나를 임시 파일에 쓴 뒤 이름을 바꿔, 중간에 죽어도 깨진 파일이 남지 않게 저장합니다."""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = _checkpoint_path(checkpoint_dir, feature, highlow, category)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"feature": feature, "highlow": highlow, "category": category, "sentences": sentences},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def generate_feature_descriptions(max_workers: int = MAX_WORKERS, checkpoint_dir: str = CHECKPOINT_DIR,
+                                  resume: bool = True, rate: float = REQUESTS_PER_SECOND) -> Dict[str, List[str]]:
+    """
+    각 오디오 피처별로 high/low 예시 문장 30개씩 생성합니다.
+    (feature, high/low, category) 54개 생성을 max_workers개 스레드로 동시에 실행하고, 끝나는 대로 체크포인트에 저장합니다.
+    스레드들은 연결 풀이 max_workers개인 Session 하나와 초당 rate개 요청 제한기 하나를 공유합니다.
+    resume=True이면 체크포인트가 있는 조합은 다시 생성하지 않습니다. (실패해 빈 결과는 저장하지 않으므로 다음 실행에서 재시도)
+    """
+    jobs: List[Tuple[str, str, str]] = [
+        (feature, highlow, category)
+        for feature in FEATURES for highlow in HIGHLOWS for category in FEATURE_CATEGORIES
+    ]
+    results: Dict[Tuple[str, str, str], List[str]] = {}
+    pending = []
+    for job in jobs:
+        cached = load_checkpoint(checkpoint_dir, *job) if resume else None
+        if cached:
+            results[job] = cached
+        else:
+            pending.append(job)
+    print(f"{len(jobs)}개 조합 중 {len(results)}개는 체크포인트에서 불러옴, {len(pending)}개 생성")
+
+    session = make_session(max_workers)
+    rate_limiter = RateLimiter(rate)
+
+    def run(job: Tuple[str, str, str]) -> List[str]:
+        feature, highlow, category = job
+        print(f"Generating {feature} {highlow} - {category}...")
+        return generate_sentences_for_category(feature, category, highlow, 10, session, rate_limiter)
+
+    failed = []
+    with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run, job): job for job in pending}
+        for future in as_completed(futures):
+            job = futures[future]
+            sentences = future.result()
+            results[job] = sentences
+            if sentences:
+                save_checkpoint(checkpoint_dir, *job, sentences)
+            else:
+                failed.append(job)
+
     feature_examples = {}
-    for feature in [
-        'danceability', 'energy', 'loudness', 'speechiness',
-        'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo']:
-        for highlow in ['높은', '낮은']:
+    for feature in FEATURES:
+        for highlow in HIGHLOWS:
             all_sentences = []
-            for category in feature_categories:
-                print(f"Generating {feature} {highlow} - {category}...")
-                sentences = generate_sentences_for_category(feature, category, highlow, 10)
-                all_sentences.extend(sentences)
+            for category in FEATURE_CATEGORIES:
+                all_sentences.extend(results.get((feature, highlow, category), []))
             # 30개로 제한
             key = f"{feature}_{'high' if highlow == '높은' else 'low'}"
             feature_examples[key] = all_sentences[:30]
             print(f"Generated {len(feature_examples[key])} sentences for {feature} {highlow}")
+    if failed:
+        print(f"{len(failed)}개 조합 생성 실패, 다시 실행하면 실패한 조합만 재시도합니다: {failed}")
     # JSON 파일로 저장
     with open('feature_descriptions.json', 'w', encoding='utf-8') as f:
         json.dump(feature_examples, f, ensure_ascii=False, indent=2)
     return feature_examples
 
 def main():
+    parser = argparse.ArgumentParser(description="feature별 high/low 예시 문장 생성")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="동시 요청 수")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="초당 최대 요청 수")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--fresh", action="store_true", help="체크포인트를 무시하고 모두 다시 생성")
+    args = parser.parse_args()
+
     print("Generating feature descriptions...")
-    feature_examples = generate_feature_descriptions()
+    feature_examples = generate_feature_descriptions(args.workers, args.checkpoint_dir, resume=not args.fresh,
+                                                     rate=args.rate)
     print("\nAll generated descriptions:")
     for feature, examples in feature_examples.items():
         print(f"\n{feature}:")
@@ -1,62 +1,264 @@
 import numpy as np
 import json
 import time
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
+import sys
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# 스크립트로 직접 실행해도 app 패키지를 찾을 수 있도록 저장소 루트를 경로에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.core.backends import get_backend
+from app.core.embedding_cache import SqliteVectorStore, embedding_key
+from app.core.similarity import write_embedding_artifact
 
 # .env 파일에서 API 키 로드
 load_dotenv()
-UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 
-# Upstage API 클라이언트 설정
-client = OpenAI(
-    api_key=UPSTAGE_API_KEY,
-    base_url="https://api.upstage.ai/v1"
-)
+# 문장 임베딩을 (문장, 모델) 해시로 저장해 두는 파일 (바뀐 문장만 다시 임베딩)
+VECTOR_STORE_PATH = 'sentence_vectors.sqlite'
+# 임베딩 모델 이름 (MODEL_BACKEND로 고른 백엔드의 모델)
+EMBEDDING_MODEL = get_backend().model
+
+# 병렬 임베딩 빌드 기본값: 동시 요청 수, 배치 크기(시작/최대), 배치당 최대 토큰, 배치 재시도 횟수, 목표 응답 시간(초)
+BUILD_CONCURRENCY = 4
+INITIAL_BATCH_SIZE = 32
+MAX_BATCH_SIZE = 100
+MAX_BATCH_TOKENS = 8000
+MAX_RETRIES = 5
+TARGET_BATCH_LATENCY = 2.0
 
-def embed_sentences(sentences, model="embedding-passage"):
+def embed_sentences(sentences):
     """
-    Upstage Solar 임베딩 API를 통해 문장 리스트의 임베딩을 생성합니다.
+    임베딩 백엔드(기본 Upstage Solar 임베딩 API, MODEL_BACKEND=local이면 로컬 임베더)로 문장 리스트의 임베딩을 생성합니다.
+    실패하거나 받은 벡터 수가 문장 수와 다르면 예외를 던집니다.
     """
-    try:
-        response = client.embeddings.create(
-            input=sentences,
-            model=model
-        )
-        return [item.embedding for item in response.data]
-    except Exception as e:
-        print(f"Error during embedding: {e}")
-        return []
-
-def save_embeddings_to_json():
+    embeddings = get_backend().embed(sentences)
+    if len(embeddings) != len(sentences):
+        raise ValueError(f"expected {len(sentences)} embeddings, got {len(embeddings)}")
+    return embeddings
+
+def estimate_tokens(text):
+    """API 토큰 수의 대략적인 추정치 (UTF-8 바이트 수 / 3, 한글 한 글자 ≈ 1토큰)."""
+    return max(1, len(text.encode('utf-8')) // 3)
+
+class AdaptiveBatchSize:
+    """
+    응답 시간과 오류에 따라 배치 크기를 조절합니다.
+    목표 시간보다 충분히 빠르면 키우고, 느리거나 실패하면 절반으로 줄입니다.
+    """
+
+    def __init__(self, initial=INITIAL_BATCH_SIZE, minimum=1, maximum=MAX_BATCH_SIZE, target_latency=TARGET_BATCH_LATENCY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.size = max(minimum, min(initial, maximum))
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            return self.size
+
+    def record_success(self, latency):
+        with self._lock:
+            if latency < self.target_latency / 2:
+                self.size = min(self.maximum, max(self.size + 1, int(self.size * 1.5)))
+            elif latency > self.target_latency:
+                self.size = max(self.minimum, self.size // 2)
+
+    def record_failure(self):
+        with self._lock:
+            self.size = max(self.minimum, self.size // 2)
+
+class TokenBudget:
+    """분당 토큰 예산 (token bucket). 여러 스레드가 공유하며, 예산이 모자라면 채워질 때까지 기다립니다."""
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = float(tokens_per_minute)
+        self.available = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        # 한 배치가 예산 전체보다 크면 예산이 가득 찼을 때 보냄
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                wait = (tokens - self.available) / self.rate
+            time.sleep(wait)
+
+def embed_texts_parallel(texts, concurrency=BUILD_CONCURRENCY, initial_batch_size=INITIAL_BATCH_SIZE,
+                         max_batch_size=MAX_BATCH_SIZE, max_batch_tokens=MAX_BATCH_TOKENS, tokens_per_minute=None,
+                         max_retries=MAX_RETRIES, on_batch=None):
+    """
+    문장들을 concurrency개 스레드로 나눠 배치 임베딩합니다.
+    - 배치 크기는 AdaptiveBatchSize가 응답 시간/오류에 따라 조절하고, 배치당 추정 토큰은 max_batch_tokens를 넘지 않음
+    - tokens_per_minute가 있으면 전체 요청의 분당 추정 토큰을 그 안으로 제한
+    - 실패한 배치의 문장은 큐 앞으로 되돌려 (더 작은 배치로) 재시도하고, 한 문장이 max_retries번 넘게 실패하면 예외
+    - on_batch: 배치가 끝날 때마다 {문장: 벡터}로 호출 (진행 상황을 바로 저장하는 용도)
+    반환: {문장: 벡터}
+    """
+    queue = deque(dict.fromkeys(texts))
+    total = len(queue)
+    attempts = {}
+    results = {}
+    lock = threading.Lock()
+    failure = []
+    sizer = AdaptiveBatchSize(initial_batch_size, maximum=max_batch_size)
+    budget = TokenBudget(tokens_per_minute) if tokens_per_minute else None
+
+    def take_batch():
+        size = sizer.current()
+        batch, tokens = [], 0
+        while queue and len(batch) < size:
+            cost = estimate_tokens(queue[0])
+            if batch and tokens + cost > max_batch_tokens:
+                break
+            batch.append(queue.popleft())
+            tokens += cost
+        return batch, tokens
+
+    def worker():
+        while True:
+            with lock:
+                if failure or not queue:
+                    return
+                batch, tokens = take_batch()
+            if budget is not None:
+                budget.acquire(tokens)
+            start = time.time()
+            try:
+                vectors = embed_sentences(batch)
+            except Exception as e:
+                sizer.record_failure()
+                with lock:
+                    retries = max(attempts.get(text, 0) for text in batch) + 1
+                    for text in batch:
+                        attempts[text] = attempts.get(text, 0) + 1
+                    if retries > max_retries:
+                        failure.append(RuntimeError(f"embedding batch of {len(batch)} sentences failed {retries} times: {e}"))
+                        return
+                    queue.extendleft(reversed(batch))
+                print(f"  - 배치 실패 ({len(batch)}개 문장, {retries}번째): {e}")
+                time.sleep(min(30.0, 0.5 * 2 ** retries))
+                continue
+            latency = time.time() - start
+            sizer.record_success(latency)
+            done = dict(zip(batch, vectors))
+            if on_batch is not None:
+                on_batch(done)
+            with lock:
+                results.update(done)
+                progress = len(results)
+            print(f"  - 배치 완료: {len(batch)}개 문장, {latency:.2f}s (진행 {progress}/{total}, 다음 배치 크기 {sizer.current()})")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    if failure:
+        raise failure[0]
+    if len(results) != total:
+        raise RuntimeError(f"embedded {len(results)} of {total} sentences")
+    dims = {len(vector) for vector in results.values()}
+    if len(dims) > 1:
+        raise RuntimeError(f"embeddings have inconsistent dimensions: {sorted(dims)}")
+    return results
+
+def save_embeddings_artifact(feature_embeddings, model=EMBEDDING_MODEL,
+                             matrix_path='feature_embeddings.npy',
+                             manifest_path='feature_embeddings_manifest.json', centroid_k=1):
+    """
+    임베딩을 서버가 파싱 없이 mmap으로 읽을 수 있는 바이너리 아티팩트로 저장합니다.
+    - feature_embeddings.npy: feature 순서대로 쌓은 L2 정규화 float32 행렬
+    - feature_embeddings_manifest.json: feature별 행 구간(offsets), 모델 이름, 차원
+    - feature_centroids.npy: centroid 모드용 뱅크별 centroid (centroid_k개씩)
+    """
+    rows, dim = write_embedding_artifact(feature_embeddings, model, matrix_path, manifest_path, centroid_k=centroid_k)
+    print(f"바이너리 아티팩트 저장 완료: {matrix_path} ({rows} x {dim}), {manifest_path}, centroid k={centroid_k}")
+
+def convert_json_to_artifact(centroid_k=1, model=None):
+    """
+    이미 만들어 둔 feature_embeddings.json을 API 호출 없이 바이너리 아티팩트로 변환합니다.
+    JSON에는 모델이 기록되지 않으므로 model을 주지 않으면 manifest의 모델은 null(알 수 없음)입니다.
+    """
+    with open('feature_embeddings.json', 'r', encoding='utf-8') as f:
+        feature_embeddings = json.load(f)
+    if model is None:
+        print("feature_embeddings.json을 만든 모델을 알 수 없어 manifest에 기록하지 않습니다. (--embedding-model로 지정)")
+    save_embeddings_artifact(feature_embeddings, model=model, centroid_k=centroid_k)
+
+def embed_feature_sentences(feature_sentences, model=EMBEDDING_MODEL, store=None, **build_options):
+    """
+    feature별 문장 리스트를 임베딩합니다.
+    store(SqliteVectorStore)가 있으면 (문장, 모델) 해시로 저장된 벡터를 재사용해 새로 추가되거나 바뀐 문장만 API로 임베딩하고,
+    example_sentences.json에서 사라진 문장의 벡터는 store에서 지웁니다.
+    새로 임베딩할 문장은 feature 구분 없이 embed_texts_parallel(build_options)로 병렬 처리합니다.
+    반환: {feature: [임베딩, ...]} (문장 순서 그대로, 개수가 맞지 않으면 예외)
+    """
+    keys = {sentence: embedding_key(sentence, model) for sentences in feature_sentences.values() for sentence in sentences}
+    cached = store.get_many(set(keys.values())) if store is not None else {}
+    # 여러 feature에 같은 문장이 있어도 한 번만 임베딩
+    missing = [sentence for sentence, key in keys.items() if key not in cached]
+    print(f"전체 {len(keys)}개 문장 중 {len(keys) - len(missing)}개 재사용, {len(missing)}개 임베딩")
+
+    def save_batch(done):
+        # 배치가 끝나는 대로 저장해 두어, 중간에 실패해도 다음 실행에서 이어서 임베딩
+        if store is not None:
+            store.put_many({keys[sentence]: vector for sentence, vector in done.items()}, model)
+
+    if missing:
+        embedded = embed_texts_parallel(missing, on_batch=save_batch, **build_options)
+        cached.update({keys[sentence]: np.asarray(vector, dtype=np.float32) for sentence, vector in embedded.items()})
+    if store is not None:
+        removed = store.prune(keys.values(), model)
+        if removed:
+            print(f"삭제된 문장의 벡터 {removed}개 정리")
+    feature_embeddings = {
+        feature: [np.asarray(cached[keys[sentence]], dtype=np.float32).tolist() for sentence in sentences]
+        for feature, sentences in feature_sentences.items()
+    }
+    # 문장 수와 임베딩 수가 어긋난 아티팩트가 서버로 가지 않도록 확인
+    for feature, sentences in feature_sentences.items():
+        if len(feature_embeddings[feature]) != len(sentences):
+            raise RuntimeError(f"{feature}: {len(sentences)} sentences but {len(feature_embeddings[feature])} embeddings")
+    return feature_embeddings
+
+def save_embeddings_to_json(centroid_k=1, incremental=True, **build_options):
     """
     example_sentences.json의 feature별 문장 리스트를 임베딩하여
     feature_embeddings.json에 저장합니다.
+    incremental=True이면 sentence_vectors.sqlite에 저장된 벡터를 재사용하고 바뀐 문장만 임베딩합니다.
+    build_options: embed_texts_parallel의 동시성/배치/토큰 예산/재시도 설정
     """
     # 전처리된 문장 로드
     with open('example_sentences.json', 'r', encoding='utf-8') as f:
         feature_sentences = json.load(f)
     
-    feature_embeddings = {}
-    batch_size = 32
     print("Solar Embedding 생성 중...")
-    
-    for feature, sentences in feature_sentences.items():
-        print(f"\n{feature} 피처 처리 중... ({len(sentences)}개 문장)")
-        embeddings = []
-        for i in range(0, len(sentences), batch_size):
-            batch = sentences[i:i+batch_size]
-            batch_embeddings = embed_sentences(batch)
-            embeddings.extend(batch_embeddings)
-            print(f"  - 배치 {i//batch_size + 1} 완료: {len(batch)}개 문장")
-            # API 과부하 방지
-            # time.sleep(0.5)
-        feature_embeddings[feature] = embeddings
-        print(f"  - 임베딩 완료: {len(embeddings)}개, 차원: {len(embeddings[0]) if embeddings else 0}")
+    store = SqliteVectorStore(VECTOR_STORE_PATH)
+    if not incremental:
+        # 전체 재임베딩: 저장된 벡터를 모두 지우고 새로 채움
+        store.prune([], EMBEDDING_MODEL)
+    try:
+        feature_embeddings = embed_feature_sentences(feature_sentences, EMBEDDING_MODEL, store, **build_options)
+    finally:
+        store.close()
     # JSON 파일로 저장
     with open('feature_embeddings.json', 'w', encoding='utf-8') as f:
         json.dump(feature_embeddings, f, ensure_ascii=False, indent=2)
+    # 서버가 바로 mmap으로 읽는 바이너리 아티팩트도 함께 저장
+    save_embeddings_artifact(feature_embeddings, model=EMBEDDING_MODEL, centroid_k=centroid_k)
     # 통계 출력
     print("\n=== Feature별 통계 ===")
     for feature, embeddings in feature_embeddings.items():
@@ -66,4 +268,23 @@ def save_embeddings_to_json():
     print("\nJSON 파일로 저장 완료!")
 
 if __name__ == "__main__":
-    save_embeddings_to_json() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="feature 예시 문장 임베딩 생성")
+    parser.add_argument("--from-json", action="store_true", help="API 호출 없이 feature_embeddings.json을 아티팩트로 변환")
+    parser.add_argument("--embedding-model", default=None, help="--from-json: feature_embeddings.json을 만든 임베딩 모델")
+    parser.add_argument("--full", action="store_true", help="저장된 문장 벡터를 무시하고 모든 문장을 다시 임베딩")
+    parser.add_argument("--centroid-k", type=int, default=1, help="centroid 모드에서 뱅크마다 만들 부분 centroid 수 (1이면 평균 벡터)")
+    parser.add_argument("--concurrency", type=int, default=BUILD_CONCURRENCY, help="동시 임베딩 요청 수")
+    parser.add_argument("--batch-size", type=int, default=INITIAL_BATCH_SIZE, help="시작 배치 크기 (응답 시간에 따라 조절)")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-batch-tokens", type=int, default=MAX_BATCH_TOKENS, help="배치당 최대 추정 토큰")
+    parser.add_argument("--tokens-per-minute", type=int, default=None, help="분당 추정 토큰 예산 (기본: 제한 없음)")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES, help="문장별 최대 재시도 횟수")
+    args = parser.parse_args()
+    if args.from_json:
+        convert_json_to_artifact(args.centroid_k, args.embedding_model)
+    else:
+        save_embeddings_to_json(
+            args.centroid_k, incremental=not args.full, concurrency=args.concurrency,
+            initial_batch_size=args.batch_size, max_batch_size=args.max_batch_size,
+            max_batch_tokens=args.max_batch_tokens, tokens_per_minute=args.tokens_per_minute,
+            max_retries=args.max_retries) 
\ No newline at end of file
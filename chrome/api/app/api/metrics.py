@@ -0,0 +1,49 @@
+import os
+import time
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from app.core import metrics
+
+router = APIRouter()
+
+# 응답에 단계별 처리 시간(Server-Timing 헤더)을 붙일지 여부
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+# 본문을 헤더를 보낸 뒤에 만드는 스트리밍 응답 형식 (헤더 시점에는 단계별 처리 시간이 아직 없음)
+STREAMING_MEDIA_TYPES = ("application/x-ndjson", "text/event-stream")
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    이 워커 프로세스의 요청 수, 단계별 처리 시간 히스토그램, 외부 API 호출 수, 임베딩 캐시 적중 수를
+    Prometheus 텍스트 형식으로 반환합니다.
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+async def metrics_middleware(request: Request, call_next):
+    """
+    요청마다 처리 시간과 상태 코드를 집계하고, 단계별 처리 시간을 Server-Timing 헤더로 붙입니다.
+    스트리밍 응답은 본문을 만드는 단계가 헤더를 보낸 뒤에 실행되므로 Server-Timing을 붙이지 않습니다.
+    """
+    timings, token = metrics.start_request_timings()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        metrics.http_exceptions.inc(_route_path(request))
+        metrics.http_requests.inc(request.method, _route_path(request), 500)
+        raise
+    finally:
+        metrics.end_request_timings(token)
+    elapsed = time.perf_counter() - start
+    path = _route_path(request)
+    metrics.http_requests.inc(request.method, path, response.status_code)
+    metrics.http_request_seconds.observe(elapsed, request.method, path)
+    if SERVER_TIMING and not response.headers.get("content-type", "").startswith(STREAMING_MEDIA_TYPES):
+        timings.add("total", elapsed)
+        response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+def _route_path(request: Request) -> str:
+    # 라벨 수가 늘어나지 않도록 실제 경로 대신 라우트 템플릿을 사용
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
@@ -1,10 +1,74 @@
-from fastapi import APIRouter
-from app.core import recommendation
-from app.models.schemas import RecommendRequest, TrackInfo
+import json
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from app.core import metrics, recommendation
+from app.core.state import RecommendationState, get_state_holder
+from app.models.schemas import BatchRecommendRequest, RecommendRequest, TrackInfo
 
 router = APIRouter()
 
+_track = TypeAdapter(TrackInfo)
+_track_list = TypeAdapter(list[TrackInfo])
+_track_lists = TypeAdapter(list[list[TrackInfo]])
+
+def _serialize(adapter: TypeAdapter, results) -> JSONResponse:
+    """추천 결과를 응답 모델로 검증해 JSON 응답을 만듭니다. (직렬화 단계 시간을 따로 기록)"""
+    with metrics.stage("serialize"):
+        return JSONResponse(adapter.dump_python(adapter.validate_python(results), mode="json"))
+
+def get_recommendation_state(request: Request) -> RecommendationState:
+    with metrics.stage("data_load"):
+        return get_state_holder(request.app).get()
+
 @router.post("/recommend", response_model=list[TrackInfo])
-def recommend_endpoint(req: RecommendRequest):
-    results = recommendation.recommend_tracks(req.query)
-    return results
\ No newline at end of file
+async def recommend_endpoint(req: RecommendRequest, state: RecommendationState = Depends(get_recommendation_state)):
+    results = await recommendation.recommend_tracks_async(
+        req.query, top_k=req.top_k, state=state, languages=req.languages, min_popularity=req.min_popularity,
+        feature_mode=req.feature_mode)
+    return _serialize(_track_list, results)
+
+@router.post("/recommend/stream")
+async def recommend_stream_endpoint(req: RecommendRequest, state: RecommendationState = Depends(get_recommendation_state)):
+    """
+    /recommend의 스트리밍 버전 (NDJSON, 한 줄에 이벤트 하나).
+    상위 feature와 방향({"type": "features"})을 먼저 보내고, 곡({"type": "track"})을 중복 제거가 고르는 즉시 순위 순서대로 보낸 뒤
+    {"type": "done"}으로 끝납니다. 처리 중 오류가 나면 {"type": "error"}를 보내고 끝납니다.
+    """
+    async def lines():
+        try:
+            async for event in recommendation.recommend_tracks_stream(
+                    req.query, top_k=req.top_k, state=state, languages=req.languages,
+                    min_popularity=req.min_popularity, feature_mode=req.feature_mode):
+                if event["type"] == "track":
+                    event["track"] = _track.dump_python(_track.validate_python(event["track"]), mode="json")
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"Streaming recommendation failed: {e}")
+            yield json.dumps({"type": "error", "message": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/recommend/batch", response_model=list[list[TrackInfo]])
+async def recommend_batch_endpoint(req: BatchRecommendRequest, state: RecommendationState = Depends(get_recommendation_state)):
+    """
+    여러 쿼리를 한 번에 추천합니다. 결과는 요청한 쿼리 순서대로의 곡 목록입니다.
+    """
+    queries = [
+        {"query": q.query, "top_k": q.top_k, "languages": q.languages, "min_popularity": q.min_popularity,
+         "feature_mode": q.feature_mode}
+        for q in req.queries
+    ]
+    results = await recommendation.recommend_tracks_batch_async(queries, state=state)
+    return _serialize(_track_lists, results)
+
+@router.post("/recommend/reload")
+def reload_endpoint(request: Request, force: bool = False):
+    """
+    데이터 파일이 바뀌었으면 추천 상태를 다시 로드합니다. (force=true이면 무조건 다시 로드)
+    요청을 받은 워커에만 적용됩니다. 멀티 워커에서 다른 워커는 STATE_POLL_SECONDS마다 데이터 파일 변경을
+    확인해 다시 로드하므로, force 없이 파일 교체만으로 모든 워커에 반영됩니다.
+    """
+    holder = get_state_holder(request.app)
+    reloaded = holder.reload(force=force)
+    return {"reloaded": reloaded, "version": holder.get().version}
\ No newline at end of file
@@ -1,19 +1,12 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from openai import OpenAI
-import os
 from dotenv import load_dotenv
+from app.core.backends import get_backend
 
 load_dotenv()
 
 router = APIRouter()
 
-# Upstage API 클라이언트 설정
-client = OpenAI(
-    api_key=os.getenv("UPSTAGE_API_KEY"),
-    base_url="https://api.upstage.ai/v1"
-)
-
 class SummarizeRequest(BaseModel):
     content: str
 
@@ -29,7 +22,7 @@ def summarize_content(req: SummarizeRequest):
     print(f"[SUMMARIZE] Content preview: {req.content[:100]}...")
     
     try:
-        response = client.chat.completions.create(
+        summary = get_backend().chat(
             model="solar-pro",
             messages=[
                 {
@@ -53,10 +46,9 @@ def summarize_content(req: SummarizeRequest):
 답변:"""
                 }
             ],
-            stream=False,
         )
         
-        summary = response.choices[0].message.content.strip()
+        summary = summary.strip()
         print(f"[SUMMARIZE] Generated summary: {summary}")
         return SummarizeResponse(summary=summary)
         
@@ -0,0 +1,75 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class EmbeddingBatcher:
+    """
+    동시에 들어온 임베딩 요청을 짧은 시간(window) 동안 모아 한 번의 배치 호출로 보내고,
+    결과 벡터를 기다리던 호출자들에게 나눠 줍니다.
+    window가 지나거나 max_batch개가 모이면 바로 전송합니다.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+                 window: float = 0.005, max_batch: int = 32):
+        self.embed_batch = embed_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        # 이미 전송 대기 중이거나 요청 중인 텍스트 -> 결과 future (같은 텍스트는 한 번만 요청)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 실행 중인 배치 task (가비지 컬렉션으로 사라지지 않도록 참조 유지)
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 다른 이벤트 루프에서 호출되면 이전 루프의 대기 상태는 버림
+            self._loop = loop
+            self._pending = []
+            self._inflight = {}
+            self._tasks = set()
+            self._timer = None
+        future = self._inflight.get(text)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = loop.create_future()
+        self._inflight[text] = future
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        self.batches += 1
+        self.items += len(texts)
+        try:
+            vectors = await self.embed_batch(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            for text, future in batch:
+                self._inflight.pop(text, None)
+                future.set_exception(e)
+                # 기다리는 호출자가 없어도 '예외가 회수되지 않음' 경고가 나지 않도록 표시
+                future.exception()
+            return
+        for (text, future), vector in zip(batch, vectors):
+            self._inflight.pop(text, None)
+            future.set_result(vector)
@@ -0,0 +1,223 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 지연 시간 히스토그램 기본 구간 (초)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """단조 증가 카운터 (라벨 값 조합마다 따로 집계)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = tuple(str(label) for label in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(tuple(str(label) for label in labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram:
+    """구간별 누적 개수, 합계, 개수를 집계하는 히스토그램 (Prometheus histogram 형식)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 값 조합 -> [구간별 개수..., +Inf 개수], 합계
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        key = tuple(str(label) for label in labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, *labels) -> int:
+        return sum(self._counts.get(tuple(str(label) for label in labels), []))
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    프로세스 안의 지표 모음. render()는 Prometheus 텍스트 형식을 반환합니다.
+    collector는 호출될 때마다 (이름, 종류, 설명, [(라벨 dict, 값)])을 돌려주는 함수로, 다른 모듈이 이미 세고 있는 값을 노출할 때 씁니다.
+    여러 워커로 실행하면 워커마다 따로 집계됩니다.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def register_collector(self, collector: Callable):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter("mcp_http_requests_total", "HTTP 요청 수", ("method", "path", "status"))
+http_request_seconds = registry.histogram("mcp_http_request_duration_seconds", "HTTP 요청 처리 시간", ("method", "path"))
+http_exceptions = registry.counter("mcp_http_exceptions_total", "처리 중 예외가 난 HTTP 요청 수", ("path",))
+stage_seconds = registry.histogram("mcp_recommend_stage_duration_seconds", "추천 파이프라인 단계별 처리 시간", ("stage",))
+upstream_requests = registry.counter("mcp_upstream_requests_total", "외부 API 호출 수", ("api", "outcome"))
+upstream_seconds = registry.histogram("mcp_upstream_request_duration_seconds", "외부 API 호출 시간", ("api",))
+semantic_similarity = registry.histogram(
+    "mcp_semantic_cache_similarity", "시맨틱 캐시 조회 시 가장 가까운 이전 쿼리와의 코사인 유사도", (),
+    buckets=(0.5, 0.7, 0.8, 0.85, 0.9, 0.93, 0.95, 0.97, 0.98, 0.99, 0.995, 1.0))
+
+
+class StageTimings:
+    """한 요청 안에서 단계별로 걸린 시간(초)을 모읍니다. 같은 단계가 여러 번 실행되면 합산합니다."""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing 헤더 값 (밀리초)."""
+        with self._lock:
+            items = list(self.durations.items())
+        return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in items)
+
+
+# 현재 요청의 StageTimings (asyncio.to_thread로 넘긴 작업에도 그대로 전달됨)
+_current_timings: contextvars.ContextVar[Optional[StageTimings]] = contextvars.ContextVar("stage_timings", default=None)
+
+
+def start_request_timings() -> Tuple[StageTimings, contextvars.Token]:
+    timings = StageTimings()
+    return timings, _current_timings.set(timings)
+
+
+def end_request_timings(token: contextvars.Token):
+    _current_timings.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """with stage("embedding"): ... 구간의 시간을 단계별 히스토그램과 현재 요청의 StageTimings에 기록합니다."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, name)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+@contextmanager
+def upstream_call(api: str):
+    """외부 API 호출 한 번의 시간과 성공/실패를 기록합니다."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        upstream_requests.inc(api, "error")
+        raise
+    else:
+        upstream_requests.inc(api, "ok")
+    finally:
+        upstream_seconds.observe(time.perf_counter() - start, api)
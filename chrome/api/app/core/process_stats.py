@@ -0,0 +1,30 @@
+import os
+import resource
+from typing import Dict, Optional
+
+
+def memory_usage() -> Dict[str, Optional[int]]:
+    """
+    현재 프로세스의 메모리 사용량(byte).
+    rss_file/rss_shmem은 mmap한 데이터 파일처럼 다른 워커와 공유될 수 있는 페이지이고,
+    rss_anon은 이 프로세스만 쓰는 메모리입니다. /proc이 없는 환경에서는 최대 RSS만 반환합니다.
+    """
+    usage = {"rss": None, "rss_anon": None, "rss_file": None, "rss_shmem": None}
+    fields = {"VmRSS": "rss", "RssAnon": "rss_anon", "RssFile": "rss_file", "RssShmem": "rss_shmem"}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    usage[fields[name]] = int(value.split()[0]) * 1024
+    except OSError:
+        # Linux가 아니면 최대 RSS로 대신함 (macOS는 byte, Linux는 KB 단위)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["rss"] = max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+    return usage
+
+
+def format_bytes(size: Optional[int]) -> str:
+    if size is None:
+        return "?"
+    return f"{size / (1024 * 1024):.1f}MB"
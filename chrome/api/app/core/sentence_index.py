@@ -0,0 +1,231 @@
+import json
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.similarity import _normalize_rows, _spherical_kmeans, _top_indices
+
+
+def _normalize_query(query_embedding) -> Optional[np.ndarray]:
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(query)
+    if norm == 0:
+        return None
+    return query / norm
+
+
+class ExactSentenceIndex:
+    """모든 예시 문장과의 유사도를 계산하는 전수 탐색 인덱스. (정답 기준)"""
+
+    backend = "exact"
+
+    def __init__(self, matrix: np.ndarray):
+        # matrix: L2 정규화된 예시 문장 임베딩 (FeatureSimilarityEngine.matrix와 같은 행 순서)
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def search(self, query_embedding, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """유사도 상위 k개 문장의 (행 번호, 유사도)를 내림차순으로 반환합니다."""
+        query = _normalize_query(query_embedding)
+        if query is None:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32)
+        similarities = self.matrix @ query
+        rows = _top_indices(similarities, k)
+        return rows, similarities[rows]
+
+    def params(self) -> Dict:
+        return {}
+
+    def matches(self, matrix: np.ndarray) -> bool:
+        return self.matrix.shape == matrix.shape
+
+    def save(self, out_dir: str, model: Optional[str] = None):
+        _write_manifest(out_dir, self, model, files={})
+
+    @classmethod
+    def load(cls, index_dir: str, manifest: Dict, matrix: np.ndarray, mmap: bool = True) -> "ExactSentenceIndex":
+        return cls(matrix)
+
+
+class IVFSentenceIndex:
+    """
+    IVF(inverted file) 근사 최근접 이웃 인덱스.
+    예시 문장을 spherical k-means로 n_lists개 군집에 나눠 두고, 쿼리와 가까운 n_probe개 군집만 탐색합니다.
+    벡터는 군집 순서로 다시 쌓아 두어 군집마다 연속된 구간 하나만 읽습니다.
+    """
+
+    backend = "ivf"
+
+    def __init__(self, centroids: np.ndarray, vectors: np.ndarray, row_ids: np.ndarray,
+                 list_offsets: np.ndarray, n_probe: int):
+        self.centroids = centroids
+        # 군집 순서로 재배열한 벡터와, 각 벡터의 원래 행 번호
+        self.vectors = vectors
+        self.row_ids = row_ids
+        # 군집 j의 벡터는 vectors[list_offsets[j]:list_offsets[j + 1]]
+        self.list_offsets = list_offsets
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, n_lists: Optional[int] = None, n_probe: Optional[int] = None,
+              train_size: int = 50000, seed: int = 0) -> "IVFSentenceIndex":
+        """
+        matrix: 예시 문장 임베딩 (정규화 여부 무관)
+        n_lists: 군집 수 (기본 sqrt(문장 수))
+        n_probe: 쿼리마다 탐색할 군집 수 (기본 n_lists의 1/8, 최소 4; calibrate_n_probe로 recall을 재서 조정)
+        train_size: k-means 학습에 쓸 최대 표본 수
+        """
+        vectors = _normalize_rows(np.asarray(matrix, dtype=np.float32))
+        rows = vectors.shape[0]
+        if n_lists is None:
+            n_lists = max(1, int(round(math.sqrt(rows))))
+        n_lists = max(1, min(n_lists, rows))
+        if n_probe is None:
+            n_probe = max(4, n_lists // 8)
+        rng = np.random.default_rng(seed)
+        sample = vectors if rows <= train_size else vectors[rng.choice(rows, train_size, replace=False)]
+        centroids = _spherical_kmeans(sample, n_lists, seed=seed)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        # 군집 번호 순으로 안정 정렬 (군집 안에서는 원래 행 순서 유지)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=centroids.shape[0])
+        list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids, np.ascontiguousarray(vectors[order]), order.astype(np.int64), list_offsets,
+                   min(n_probe, centroids.shape[0]))
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    def search(self, query_embedding, k: int, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """가까운 n_probe개 군집 안에서 유사도 상위 k개 문장의 (원래 행 번호, 유사도)를 반환합니다."""
+        query = _normalize_query(query_embedding)
+        if query is None:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32)
+        probes = _top_indices(self.centroids @ query, n_probe or self.n_probe)
+        ids = []
+        scores = []
+        for j in probes:
+            start, end = self.list_offsets[j], self.list_offsets[j + 1]
+            if end > start:
+                ids.append(self.row_ids[start:end])
+                scores.append(self.vectors[start:end] @ query)
+        if not ids:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32)
+        ids = np.concatenate(ids)
+        scores = np.concatenate(scores)
+        top = _top_indices(scores, k)
+        # 동점이면 원래 행 번호가 작은 쪽을 앞에 두어 전수 탐색과 같은 순서가 되도록 정렬
+        top = top[np.lexsort((ids[top], -scores[top]))]
+        return ids[top].astype(np.intp), scores[top]
+
+    def params(self) -> Dict:
+        return {"n_lists": self.n_lists, "n_probe": self.n_probe}
+
+    def matches(self, matrix: np.ndarray, samples: int = 16) -> bool:
+        """인덱스가 matrix(정규화된 예시 문장 임베딩)로 만든 것인지 군데군데 벡터를 비교해 확인합니다."""
+        if len(self) != matrix.shape[0] or self.vectors.shape[1] != matrix.shape[1]:
+            return False
+        positions = np.unique(np.linspace(0, len(self) - 1, min(samples, len(self))).astype(np.int64))
+        return bool(np.allclose(self.vectors[positions], matrix[self.row_ids[positions]], atol=1e-4))
+
+    def save(self, out_dir: str, model: Optional[str] = None):
+        os.makedirs(out_dir, exist_ok=True)
+        files = {
+            "centroids": "centroids.npy",
+            "vectors": "vectors.npy",
+            "row_ids": "row_ids.npy",
+            "list_offsets": "list_offsets.npy",
+        }
+        for name, file in files.items():
+            np.save(os.path.join(out_dir, file), getattr(self, name))
+        _write_manifest(out_dir, self, model, files)
+
+    @classmethod
+    def load(cls, index_dir: str, manifest: Dict, matrix: np.ndarray, mmap: bool = True) -> "IVFSentenceIndex":
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(index_dir, file), mmap_mode=mode) for name, file in manifest["files"].items()}
+        return cls(arrays["centroids"], arrays["vectors"], arrays["row_ids"], arrays["list_offsets"],
+                   int(manifest["params"]["n_probe"]))
+
+
+# backend 이름 -> 인덱스 클래스
+SENTENCE_INDEX_BACKENDS = {
+    ExactSentenceIndex.backend: ExactSentenceIndex,
+    IVFSentenceIndex.backend: IVFSentenceIndex,
+}
+
+
+def _write_manifest(out_dir: str, index, model: Optional[str], files: Dict[str, str]):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {
+        "backend": index.backend,
+        "rows": int(len(index)),
+        "model": model,
+        "params": index.params(),
+        "files": files,
+    }
+    # manifest를 마지막에 써서 인덱스 파일이 모두 준비되었음을 나타냄
+    with open(os.path.join(out_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def build_sentence_index(matrix: np.ndarray, backend: str = "ivf", **params):
+    """예시 문장 임베딩 행렬로 backend 종류의 문장 인덱스를 만듭니다."""
+    if backend not in SENTENCE_INDEX_BACKENDS:
+        raise ValueError(f"unknown sentence index backend: {backend}")
+    if backend == ExactSentenceIndex.backend:
+        return ExactSentenceIndex(_normalize_rows(np.asarray(matrix, dtype=np.float32)))
+    return SENTENCE_INDEX_BACKENDS[backend].build(matrix, **params)
+
+
+def load_sentence_index(index_dir: str, matrix: np.ndarray, mmap: bool = True):
+    """
+    build_sentence_index.py가 저장한 인덱스를 엽니다.
+    matrix: 유사도 엔진의 정규화된 행렬 (exact 인덱스는 이 행렬을 그대로 사용)
+    """
+    with open(os.path.join(index_dir, "manifest.json"), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest["rows"] != matrix.shape[0]:
+        raise ValueError(f"sentence index {index_dir} has {manifest['rows']} rows, embeddings have {matrix.shape[0]}")
+    backend = SENTENCE_INDEX_BACKENDS.get(manifest["backend"])
+    if backend is None:
+        raise ValueError(f"unknown sentence index backend: {manifest['backend']}")
+    index = backend.load(index_dir, manifest, matrix, mmap=mmap)
+    if not index.matches(matrix):
+        raise ValueError(f"sentence index {index_dir} was built from different embeddings")
+    return index
+
+
+def recall_at_k(index, exact: ExactSentenceIndex, queries: np.ndarray, k: int) -> float:
+    """쿼리마다 전수 탐색 상위 k개 중 인덱스가 찾은 비율의 평균."""
+    recalls: List[float] = []
+    for query in queries:
+        expected, _ = exact.search(query, k)
+        if len(expected) == 0:
+            continue
+        found, _ = index.search(query, k)
+        recalls.append(len(set(expected.tolist()) & set(found.tolist())) / len(expected))
+    return float(np.mean(recalls)) if recalls else 1.0
+
+
+def calibrate_n_probe(index: IVFSentenceIndex, exact: ExactSentenceIndex, queries: np.ndarray, k: int,
+                      min_recall: float) -> Tuple[int, float]:
+    """
+    recall@k가 min_recall 이상이 될 때까지 n_probe를 두 배씩 늘리고, 정한 값을 index.n_probe에 넣습니다.
+    n_probe가 군집 수에 닿으면(전수 탐색과 같음) 멈춥니다. 반환: (n_probe, recall@k)
+    """
+    n_probe = max(1, min(index.n_probe, index.n_lists))
+    while True:
+        index.n_probe = n_probe
+        recall = recall_at_k(index, exact, queries, k)
+        if recall >= min_recall or n_probe >= index.n_lists:
+            return n_probe, recall
+        n_probe = min(n_probe * 2, index.n_lists)
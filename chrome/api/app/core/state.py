@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core import recommendation
+from app.core.similarity import FeatureSimilarityEngine
+from app.core.track_store import TrackStore
+
+# 추천 상태를 구성하는 데이터 파일들 (변경 감지 대상)
+DATA_FILES = [
+    'example_sentences.json',
+    'feature_embeddings.json',
+    'feature_embeddings.npy',
+    'feature_embeddings_manifest.json',
+    'spotify_tracknames_updated.csv',
+    os.path.join('track_catalog', 'manifest.json'),
+    os.path.join('sentence_index', 'manifest.json'),
+]
+
+# 워커마다 데이터 파일 변경을 확인하는 주기(초). 0이면 확인하지 않음 (/recommend/reload 요청으로만 다시 로드)
+STATE_POLL_SECONDS = float(os.getenv("STATE_POLL_SECONDS", "10"))
+
+
+def data_files_signature(data_dir: str = recommendation.data_dir) -> Tuple:
+    """데이터 파일들의 (이름, 수정 시각, 크기) 목록. 파일이 바뀌면 값이 달라집니다."""
+    signature = []
+    for name in DATA_FILES:
+        path = os.path.join(data_dir, name)
+        try:
+            stat = os.stat(path)
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((name, None, None))
+    return tuple(signature)
+
+
+class RecommendationState:
+    """
+    /recommend 요청마다 다시 읽던 정적 데이터(예시 문장, 임베딩, 곡 카탈로그)를
+    한 번만 로드해 두고 프로세스 수명 동안 재사용하기 위한 읽기 전용 묶음입니다.
+    """
+
+    def __init__(self, feature_sentences: Dict, engine: FeatureSimilarityEngine, tracks: TrackStore, signature: Tuple):
+        self.feature_sentences = feature_sentences
+        self.engine = engine
+        self.tracks = tracks
+        self.signature = signature
+        self.version = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:12]
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, data_dir: str = recommendation.data_dir) -> "RecommendationState":
+        signature = data_files_signature(data_dir)
+        with open(os.path.join(data_dir, 'example_sentences.json'), 'r', encoding='utf-8') as f:
+            feature_sentences = json.load(f)
+        engine = recommendation.load_similarity_engine(data_dir, feature_sentences)
+        tracks = recommendation.load_track_store(data_dir)
+        return cls(feature_sentences, engine, tracks, signature)
+
+
+class RecommendationStateHolder:
+    """
+    현재 RecommendationState를 보관합니다.
+    reload()는 새 상태를 완전히 만든 뒤 참조만 교체하므로, 처리 중인 요청은 이전 상태를 끝까지 사용합니다.
+    상태와 결과 캐시는 워커 프로세스마다 따로 있으므로, 멀티 워커에서는 각 워커가 watch()로
+    데이터 파일 변경을 확인해 스스로 다시 로드합니다. (/recommend/reload는 요청을 받은 워커에만 적용)
+    """
+
+    def __init__(self, data_dir: str = recommendation.data_dir):
+        self.data_dir = data_dir
+        self._state: Optional[RecommendationState] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._state is not None
+
+    def get(self) -> RecommendationState:
+        state = self._state
+        if state is None:
+            self.reload()
+            state = self._state
+        return state
+
+    def reload(self, force: bool = False) -> bool:
+        """데이터 파일이 바뀌었거나 force=True이면 상태를 다시 로드합니다. 교체 여부를 반환합니다."""
+        with self._lock:
+            current = self._state
+            if not force and current is not None and current.signature == data_files_signature(self.data_dir):
+                return False
+            self._state = RecommendationState.load(self.data_dir)
+            # 이전 데이터로 계산한 추천 결과는 더 이상 쓰지 않음 (키에 버전이 들어 있어 적중하지도 않지만 메모리를 비움)
+            recommendation.result_cache.clear()
+            recommendation.semantic_cache.clear()
+            print(f"[STATE] Recommendation state loaded (version={self._state.version})")
+            return True
+
+    async def watch(self, interval: float = STATE_POLL_SECONDS):
+        """interval초마다 데이터 파일 signature를 확인해 바뀌었으면 다시 로드합니다. (lifespan에서 태스크로 실행)"""
+        while interval > 0:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                print(f"[STATE] Failed to reload recommendation state: {e}")
+
+
+def get_state_holder(app) -> RecommendationStateHolder:
+    """FastAPI 앱에 연결된 상태 보관자를 반환합니다. lifespan에서 만들지 않았다면 여기서 생성합니다."""
+    holder = getattr(app.state, 'recommendation', None)
+    if holder is None:
+        holder = RecommendationStateHolder()
+        app.state.recommendation = holder
+    return holder
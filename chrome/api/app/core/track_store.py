@@ -0,0 +1,484 @@
+import json
+import os
+import numpy as np
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Dict, Sequence, Tuple, Optional
+
+# pandas는 CSV에서 카탈로그를 만들 때만 필요하므로(바이너리 카탈로그는 mmap으로 열기만 함) 쓰는 함수 안에서 import
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 추천 점수 계산에 사용하는 Spotify 오디오 feature (행렬 열 순서)
+AUDIO_FEATURES = [
+    'danceability', 'energy', 'loudness', 'speechiness',
+    'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo']
+
+
+def normalize_feature(feature: str, values) -> np.ndarray:
+    """feature 값을 0~1 범위로 정규화합니다. (결측치는 0, loudness/tempo는 min-max 후 clip)"""
+    values = np.asarray(values, dtype=np.float64)
+    if feature == 'loudness':
+        values = np.clip((values + 45.92) / 46.672, 0, 1)
+    elif feature == 'tempo':
+        values = np.clip(values / 232.198, 0, 1)
+    return np.nan_to_num(values, nan=0.0).astype(np.float32)
+
+
+def _interned_first_valid(df: "pd.DataFrame", columns: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """
+    columns 중 앞에서부터 처음으로 값이 있는 열의 값을 고르고(모두 비어 있으면 'Unknown'),
+    같은 문자열을 하나의 id로 묶어 (곡별 id 배열, 문자열 테이블)로 반환합니다.
+    """
+    import pandas as pd
+    result = pd.Series("Unknown", index=df.index, dtype=object)
+    for column in reversed(columns):
+        if column in df.columns:
+            result = df[column].where(df[column].notnull(), result)
+    ids, names = pd.factorize(result.map(str))
+    return ids.astype(np.int32), list(names)
+
+
+def _optional_column(df: "pd.DataFrame", column: str) -> Optional[np.ndarray]:
+    if column not in df.columns:
+        return None
+    values = df[column].astype(object)
+    return values.where(values.notnull(), None).to_numpy(dtype=object)
+
+
+class StringTable:
+    """
+    문자열 목록을 UTF-8 바이트 blob과 시작 위치 배열로 보관합니다.
+    mmap으로 열면 여러 프로세스가 같은 페이지를 공유하고, 필요한 항목만 그때그때 디코딩합니다.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringTable":
+        encoded = [str(string).encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, i) -> str:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.data[start:end]).decode('utf-8')
+
+    def save(self, directory: str, name: str):
+        np.save(os.path.join(directory, f'{name}_data.npy'), self.data)
+        np.save(os.path.join(directory, f'{name}_offsets.npy'), self.offsets)
+
+    @classmethod
+    def load(cls, directory: str, name: str, mmap: bool = True) -> "StringTable":
+        mode = 'r' if mmap else None
+        return cls(
+            np.load(os.path.join(directory, f'{name}_data.npy'), mmap_mode=mode),
+            np.load(os.path.join(directory, f'{name}_offsets.npy'), mmap_mode=mode),
+        )
+
+
+class TrackStore:
+    """
+    곡 카탈로그를 열 단위 NumPy 배열로 보관합니다.
+    정규화된 오디오 feature는 (곡 수 x 9) float32 행렬 하나에 모여 있어
+    추천 점수를 곡마다 Python으로 계산하지 않고 한 번의 행렬 연산으로 구합니다.
+
+    곡은 (언어, popularity 내림차순) 순서로 정렬해 두므로, 언어별 파티션은 연속 구간이 되고
+    popularity 하한을 만족하는 곡은 각 구간의 앞부분(prefix)이 됩니다.
+
+    ranking[f, start:end]는 언어 파티션 [start, end) 안의 곡을 feature f 값 내림차순으로 정렬한 행 번호로,
+    top_eligible()이 카탈로그 전체를 훑지 않고 상위 곡을 찾을 때 사용합니다. (없으면 만들어 둠)
+    """
+
+    def __init__(self, features: np.ndarray, title_ids: np.ndarray, title_names: Sequence[str],
+                 artist_ids: np.ndarray, artist_names: Sequence[str], uris: Optional[np.ndarray] = None,
+                 language_codes: Optional[np.ndarray] = None, language_names: Optional[List[str]] = None,
+                 popularity: Optional[np.ndarray] = None, presorted: bool = False,
+                 ranking: Optional[np.ndarray] = None, popularity_key: Optional[np.ndarray] = None):
+        n = features.shape[0]
+        # 파티션 안의 정렬 키 (-popularity, popularity가 없는 곡(NaN)은 파티션 맨 뒤로)
+        # 아티팩트에 저장된 키가 있으면 그대로 써서 워커마다 배열을 새로 만들지 않음
+        if popularity is not None and (popularity_key is None or not presorted):
+            popularity_key = np.where(np.isnan(popularity), np.inf, -popularity)
+        elif popularity is None:
+            popularity_key = None
+        codes = language_codes if language_codes is not None else np.zeros(n, dtype=np.int16)
+        order = None
+        if not presorted:
+            order = np.lexsort((popularity_key if popularity_key is not None else np.zeros(n), codes))
+        if order is not None and np.any(order != np.arange(n)):
+            features, title_ids, artist_ids = features[order], title_ids[order], artist_ids[order]
+            uris = uris[order] if uris is not None else None
+            popularity = popularity[order] if popularity is not None else None
+            popularity_key = popularity_key[order] if popularity_key is not None else None
+            codes = codes[order]
+            language_codes = language_codes[order] if language_codes is not None else None
+        self.features = np.ascontiguousarray(features, dtype=np.float32)
+        self.feature_index: Dict[str, int] = {feature: i for i, feature in enumerate(AUDIO_FEATURES)}
+        # 제목/아티스트는 중복 제거를 정수 비교로 할 수 있도록 id로 보관
+        self.title_ids = np.asarray(title_ids, dtype=np.int32)
+        self.title_names = title_names
+        self.artist_ids = np.asarray(artist_ids, dtype=np.int32)
+        self.artist_names = artist_names
+        self.uris = uris
+        self.language_codes = language_codes
+        self.language_names = list(language_names or [])
+        self.popularity = popularity
+        self._popularity_key = popularity_key
+        # 언어별 [start, end) 구간 (언어 열이 없으면 전체가 하나의 파티션)
+        self.partitions: Dict[Optional[str], Tuple[int, int]] = {}
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, n]):
+            if start == end:
+                continue
+            code = int(codes[start])
+            name = self.language_names[code] if language_codes is not None and code >= 0 else None
+            self.partitions[name] = (int(start), int(end))
+        self._eligible_cache: Dict[Tuple, List[Tuple[int, int]]] = {}
+        self.ranking = ranking if ranking is not None else self._build_ranking()
+
+    def _build_ranking(self) -> np.ndarray:
+        """feature별로 각 언어 파티션 안의 곡을 값 내림차순(동점은 행 번호 순)으로 정렬한 행 번호 (9 x 곡 수)."""
+        ranking = np.empty((len(AUDIO_FEATURES), len(self)), dtype=np.int32)
+        for start, end in self.partitions.values():
+            order = np.argsort(-self.features[start:end], axis=0, kind='stable')
+            ranking[:, start:end] = order.T + start
+        return ranking
+
+    @classmethod
+    def from_dataframe(cls, df: "pd.DataFrame") -> "TrackStore":
+        import pandas as pd
+        columns = []
+        for feature in AUDIO_FEATURES:
+            if feature in df.columns:
+                columns.append(normalize_feature(feature, pd.to_numeric(df[feature], errors='coerce')))
+            else:
+                columns.append(np.zeros(len(df), dtype=np.float32))
+        features = np.stack(columns, axis=1) if len(df) else np.zeros((0, len(AUDIO_FEATURES)), dtype=np.float32)
+        language_codes, language_names = None, None
+        if 'language' in df.columns:
+            codes, uniques = pd.factorize(df['language'])
+            language_codes = codes.astype(np.int16)
+            language_names = [str(name) for name in uniques]
+        popularity = None
+        if 'popularity' in df.columns:
+            popularity = pd.to_numeric(df['popularity'], errors='coerce').to_numpy(dtype=np.float64)
+        title_ids, title_names = _interned_first_valid(df, ['track_name', 'name'])
+        artist_ids, artist_names = _interned_first_valid(df, ['artist_name', 'artists'])
+        return cls(
+            features=features,
+            title_ids=title_ids,
+            title_names=title_names,
+            artist_ids=artist_ids,
+            artist_names=artist_names,
+            uris=_optional_column(df, 'track_url'),
+            language_codes=language_codes,
+            language_names=language_names,
+            popularity=popularity,
+        )
+
+    def __len__(self) -> int:
+        return self.features.shape[0]
+
+    def save(self, directory: str):
+        """
+        카탈로그를 바이너리 아티팩트 디렉터리로 저장합니다. 숫자 열은 .npy, 문자열은 StringTable,
+        언어 이름과 열 구성은 manifest.json에 기록합니다. manifest는 마지막에 써서 완성 여부를 나타냅니다.
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'features.npy'), self.features)
+        np.save(os.path.join(directory, 'title_ids.npy'), self.title_ids)
+        np.save(os.path.join(directory, 'artist_ids.npy'), self.artist_ids)
+        StringTable.from_strings(self.title_names).save(directory, 'titles')
+        StringTable.from_strings(self.artist_names).save(directory, 'artists')
+        if self.uris is not None:
+            StringTable.from_strings(self.uris[i] or "" for i in range(len(self))).save(directory, 'uris')
+        if self.language_codes is not None:
+            np.save(os.path.join(directory, 'language_codes.npy'), self.language_codes)
+        if self.popularity is not None:
+            np.save(os.path.join(directory, 'popularity.npy'), self.popularity)
+            np.save(os.path.join(directory, 'popularity_key.npy'), self._popularity_key)
+        np.save(os.path.join(directory, 'ranking.npy'), self.ranking)
+        manifest = {
+            "tracks": len(self),
+            "features": AUDIO_FEATURES,
+            "language_names": self.language_names if self.language_codes is not None else None,
+            "has_uris": self.uris is not None,
+            "has_popularity": self.popularity is not None,
+            "has_popularity_key": self.popularity is not None,
+            "has_ranking": True,
+        }
+        with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "TrackStore":
+        """save()로 만든 아티팩트를 불러옵니다. mmap=True이면 배열을 복사하지 않고 파일을 메모리 매핑합니다."""
+        mode = 'r' if mmap else None
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest["features"] != AUDIO_FEATURES:
+            raise ValueError(f"track catalog {directory} was built with features {manifest['features']}")
+
+        def array(name):
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode)
+
+        language_names = manifest.get("language_names")
+        return cls(
+            features=array('features'),
+            title_ids=array('title_ids'),
+            title_names=StringTable.load(directory, 'titles', mmap),
+            artist_ids=array('artist_ids'),
+            artist_names=StringTable.load(directory, 'artists', mmap),
+            uris=StringTable.load(directory, 'uris', mmap) if manifest.get("has_uris") else None,
+            language_codes=array('language_codes') if language_names is not None else None,
+            language_names=language_names,
+            popularity=array('popularity') if manifest.get("has_popularity") else None,
+            presorted=True,
+            ranking=array('ranking') if manifest.get("has_ranking") else None,
+            popularity_key=array('popularity_key') if manifest.get("has_popularity_key") else None,
+        )
+
+    def eligible_slices(self, languages: List[str], min_popularity: float) -> List[Tuple[int, int]]:
+        """
+        언어와 최소 popularity 조건을 만족하는 곡들의 [start, end) 구간 목록.
+        언어 열이 없으면 언어 조건을, popularity 열이 없으면 popularity 조건을 무시합니다.
+        """
+        key = (tuple(sorted(set(languages))), float(min_popularity))
+        cached = self._eligible_cache.get(key)
+        if cached is not None:
+            return cached
+        if self.language_codes is None:
+            partitions = list(self.partitions.values())
+        else:
+            partitions = [self.partitions[language] for language in key[0] if language in self.partitions]
+        slices = []
+        for start, end in sorted(partitions):
+            if self.popularity is not None:
+                # 파티션 안에서 popularity 내림차순이므로 하한을 만족하는 곡은 앞쪽 prefix
+                end = start + int(np.searchsorted(self._popularity_key[start:end], -min_popularity, side='right'))
+            if end > start:
+                slices.append((start, end))
+        if len(self._eligible_cache) >= 64:
+            self._eligible_cache.clear()
+        self._eligible_cache[key] = slices
+        return slices
+
+    def score(self, top_features: List[Tuple[str, float, str]], rows=None) -> np.ndarray:
+        """
+        상위 feature들의 가중합으로 추천 점수를 계산합니다.
+        high 방향은 relevance * v, low 방향은 relevance * (1 - v)이므로
+        low는 가중치 -relevance와 상수항 relevance로 바꿔 하나의 행렬-벡터 곱으로 처리합니다.
+        rows: 점수를 계산할 행 인덱스 또는 slice (없으면 전체)
+        """
+        weights, bias = self._weights(top_features)
+        features = self.features if rows is None else self.features[rows]
+        return features @ weights + np.float32(bias)
+
+    def _weights(self, top_features: List[Tuple[str, float, str]]) -> Tuple[np.ndarray, float]:
+        """상위 feature 목록을 9차원 가중치 벡터와 상수항으로 바꿉니다."""
+        weights = np.zeros(len(AUDIO_FEATURES), dtype=np.float32)
+        bias = 0.0
+        for feature, relevance, direction in top_features:
+            relevance = float(relevance)
+            if direction == 'high':
+                weights[self.feature_index[feature]] += relevance
+            else:
+                weights[self.feature_index[feature]] -= relevance
+                bias += relevance
+        return weights, bias
+
+    def score_eligible(self, top_features: List[Tuple[str, float, str]], languages: List[str],
+                       min_popularity: float) -> Tuple[np.ndarray, np.ndarray]:
+        """조건을 만족하는 곡만 점수를 계산해 (행 인덱스, 점수)를 반환합니다."""
+        slices = self.eligible_slices(languages, min_popularity)
+        if not slices:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32)
+        rows = np.concatenate([np.arange(start, end) for start, end in slices])
+        scores = np.concatenate([self.score(top_features, rows=slice(start, end)) for start, end in slices])
+        return rows, scores
+
+    def top_eligible(self, top_features: List[Tuple[str, float, str]], languages: List[str],
+                     min_popularity: float, count: int) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """
+        조건을 만족하는 곡 중 점수 상위 count곡의 (행 인덱스, 점수)를 행 번호 순으로 반환합니다.
+        score_eligible() 결과에서 상위 count개(경계 동점은 행 번호가 작은 쪽)를 고른 것과 같습니다.
+        상위 feature별 정렬 목록(ranking)을 위에서부터 함께 내려가며 만난 곡만 점수를 계산하고,
+        아직 만나지 않은 곡이 받을 수 있는 최대 점수가 count번째 점수보다 낮아지면 멈춥니다. (Fagin의 threshold algorithm)
+        relevance가 음수이거나 조건을 만족하는 곡이 count곡 이하이면 전체 점수를 계산합니다.
+        반환: (행 인덱스, 점수, 조건을 만족하는 곡 전체인지 여부)
+        """
+        slices = self.eligible_slices(languages, min_popularity)
+        eligible = sum(end - start for start, end in slices)
+        weights, bias = self._weights(top_features)
+        columns = [self.feature_index[feature] for feature, relevance, _ in top_features if relevance > 0]
+        if count >= eligible or not columns or any(float(relevance) < 0 for _, relevance, _ in top_features):
+            rows, scores = self.score_eligible(top_features, languages, min_popularity)
+            return rows, scores, True
+        partitions = {start: end for start, end in self.partitions.values()}
+        rows_parts, scores_parts = [], []
+        for start, end in slices:
+            rows, scores = self._threshold_top(columns, weights, bias, start, partitions[start], end, count)
+            rows_parts.append(rows)
+            scores_parts.append(scores)
+        rows = np.concatenate(rows_parts)
+        scores = np.concatenate(scores_parts)
+        picked = np.sort(_top_window(scores, count))
+        return rows[picked], scores[picked], False
+
+    def _threshold_top(self, columns: List[int], weights: np.ndarray, bias: float, start: int, partition_end: int,
+                       end: int, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        언어 파티션 [start, partition_end) 중 조건을 만족하는 [start, end) 구간의 상위 count곡을 행 번호 순으로 반환합니다.
+        정렬 목록을 한 번에 block개씩(매번 두 배로) 내려가며, 처음 만난 곡 중 조건을 만족하는 곡만 점수를 계산합니다.
+        """
+        size = partition_end - start
+        # 지금까지 점수를 계산한 곡과 그 정렬본 (만난 곡 수만큼만 메모리를 씀)
+        seen = np.zeros(0, dtype=np.int32)
+        seen_sorted = seen
+        scores = np.zeros(0, dtype=np.float32)
+        depth = 0
+        block = max(count, 64)
+        while depth < size:
+            next_depth = min(size, depth + block)
+            # 아직 만나지 않은 곡의 점수 상한: 각 목록에서 마지막으로 본 값으로 계산한 점수
+            bound = bias
+            block_rows = []
+            for column in columns:
+                order = self.ranking[column, start:partition_end]
+                if weights[column] > 0:
+                    rows = order[depth:next_depth]
+                    last = order[next_depth - 1]
+                else:
+                    # low 방향은 값 오름차순으로 (목록을 뒤에서부터) 내려감
+                    rows = order[size - next_depth:size - depth]
+                    last = order[size - next_depth]
+                bound += float(weights[column]) * float(self.features[last, column])
+                block_rows.append(rows[rows < end])
+            # 목록 사이의 중복과 이전 블록에서 이미 만난 곡을 걸러 처음 만난 곡만 점수 계산
+            rows = np.sort(np.concatenate(block_rows))
+            rows = rows[np.r_[True, rows[1:] != rows[:-1]]] if rows.shape[0] else rows
+            if seen_sorted.shape[0] and rows.shape[0]:
+                positions = np.minimum(np.searchsorted(seen_sorted, rows), seen_sorted.shape[0] - 1)
+                rows = rows[seen_sorted[positions] != rows]
+            if rows.shape[0]:
+                seen = np.concatenate([seen, rows])
+                seen_sorted = np.sort(seen) if seen.shape[0] > rows.shape[0] else rows
+                scores = np.concatenate([scores, self.features[rows] @ weights + np.float32(bias)])
+            depth = next_depth
+            block *= 2
+            # 부동소수점 오차로 일찍 멈추지 않도록 여유를 둠
+            if seen.shape[0] >= count and scores[np.argpartition(-scores, count - 1)[count - 1]] > bound + 1e-5:
+                break
+        if seen.shape[0] > count:
+            # 상위 count곡 (경계 동점은 행 번호가 작은 쪽)
+            threshold = scores[np.argpartition(-scores, count - 1)[count - 1]]
+            above = np.flatnonzero(scores > threshold)
+            tied = np.flatnonzero(scores == threshold)
+            tied = tied[np.argsort(seen[tied], kind='stable')][:count - above.shape[0]]
+            picked = np.concatenate([above, tied])
+        else:
+            picked = np.arange(seen.shape[0])
+        picked = picked[np.argsort(seen[picked], kind='stable')]
+        return seen[picked].astype(np.intp), scores[picked]
+
+    def language(self, row: int) -> Optional[str]:
+        if self.language_codes is None or self.language_codes[row] < 0:
+            return None
+        return self.language_names[self.language_codes[row]]
+
+    def score_eligible_batch(self, top_features_list: List[List[Tuple[str, float, str]]], languages: List[str],
+                             min_popularity: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        여러 쿼리의 점수를 한 번의 행렬-행렬 곱으로 계산합니다. (모든 쿼리가 같은 필터를 쓸 때)
+        반환: (행 인덱스, (쿼리 수 x 행 수) 점수 행렬)
+        """
+        slices = self.eligible_slices(languages, min_popularity)
+        if not slices:
+            return np.zeros(0, dtype=np.intp), np.zeros((len(top_features_list), 0), dtype=np.float32)
+        pairs = [self._weights(top_features) for top_features in top_features_list]
+        weights = np.stack([w for w, _ in pairs])  # (쿼리 수 x 9)
+        bias = np.array([b for _, b in pairs], dtype=np.float32)[:, None]
+        rows = np.concatenate([np.arange(start, end) for start, end in slices])
+        scores = np.concatenate([weights @ self.features[start:end].T for start, end in slices], axis=1)
+        return rows, scores + bias
+
+    def eligible_count(self, languages: List[str], min_popularity: float) -> int:
+        return sum(end - start for start, end in self.eligible_slices(languages, min_popularity))
+
+    def track_info(self, row: int, score: float) -> Dict:
+        """한 곡의 추천 결과 dict (TrackInfo 형태)."""
+        popularity = None
+        if self.popularity is not None and not np.isnan(self.popularity[row]):
+            popularity = float(self.popularity[row])
+        return {
+            "track_name": self.title_names[self.title_ids[row]],
+            "artist_name": self.artist_names[self.artist_ids[row]],
+            "track_uri": (self.uris[row] or None) if self.uris is not None else None,
+            "recommend_score": float(score),
+            "language": self.language(row),
+            "popularity": popularity,
+        }
+
+
+def _top_window(scores: np.ndarray, window: int) -> np.ndarray:
+    """
+    점수 상위 window개의 인덱스를 (점수 내림차순, 인덱스 오름차순)으로 정렬해 반환합니다.
+    경계 동점은 인덱스가 작은 쪽을 골라, window를 키워도 앞부분 순서가 바뀌지 않게 합니다.
+    """
+    n = scores.shape[0]
+    if window >= n:
+        picked = np.arange(n)
+    else:
+        threshold = scores[np.argpartition(-scores, window - 1)[window - 1]]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:window - above.shape[0]]
+        picked = np.concatenate([above, tied])
+    return picked[np.lexsort((picked, -scores[picked]))]
+
+
+def select_unique_top_k(scores: np.ndarray, title_ids: np.ndarray, artist_ids: np.ndarray, top_k: int,
+                        rows: Optional[np.ndarray] = None) -> List[int]:
+    """
+    점수 순으로 곡을 훑으며 이미 나온 제목, 아티스트를 건너뛰고 top_k곡의 인덱스를 고릅니다.
+    전체를 정렬하지 않고 argpartition 구간(window)을 두 배씩 키워 가며,
+    top_k곡이 채워지면 바로 멈춥니다. (곡이 충분하면 항상 top_k곡을 반환)
+    제목이 중복인 곡은 아티스트 검사 전에 건너뛰고, 아티스트 중복으로 빠진 곡의 제목도 '본 것'으로 남깁니다.
+    rows: scores[i]가 카탈로그의 rows[i]번째 곡의 점수일 때 id 조회에 사용할 행 인덱스
+    반환: scores 기준 인덱스 목록
+    """
+    return list(iter_unique_top_k(scores, title_ids, artist_ids, top_k, rows=rows))
+
+
+def iter_unique_top_k(scores: np.ndarray, title_ids: np.ndarray, artist_ids: np.ndarray, top_k: int,
+                      rows: Optional[np.ndarray] = None) -> Iterator[int]:
+    """select_unique_top_k와 같은 인덱스를 같은 순서로, 고르는 즉시 하나씩 돌려줍니다. (스트리밍 응답용)"""
+    n = scores.shape[0]
+    seen_titles = set()
+    seen_artists = set()
+    picked = 0
+    done = 0
+    window = max(top_k * 4, 64)
+    while done < n and picked < top_k:
+        ranked = _top_window(scores, window)
+        for i in ranked[done:]:
+            row = rows[i] if rows is not None else i
+            title = title_ids[row]
+            if title in seen_titles:
+                continue
+            seen_titles.add(title)
+            artist = artist_ids[row]
+            if artist in seen_artists:
+                continue
+            seen_artists.add(artist)
+            picked += 1
+            yield int(i)
+            if picked >= top_k:
+                break
+        done = ranked.shape[0]
+        window *= 2
@@ -1,8 +1,36 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import test_recommend, summarize
+from app.api import health, metrics, test_recommend, summarize, thumbnail
+from app.core.process_stats import format_bytes, memory_usage
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 추천 데이터(예시 문장, 임베딩, 곡 카탈로그)를 서버 시작 시 한 번만 로드
+    try:
+        from app.core.state import RecommendationStateHolder
+        app.state.recommendation = RecommendationStateHolder()
+        app.state.recommendation.reload()
+    except Exception as e:
+        print(f"Failed to preload recommendation state: {e}")
+    memory = memory_usage()
+    print(f"[WORKER {os.getpid()}] RSS={format_bytes(memory['rss'])} "
+          f"(anon={format_bytes(memory['rss_anon'])}, file={format_bytes(memory['rss_file'])})")
+    # 다른 워커가 받은 /recommend/reload나 데이터 파일 교체를 이 워커도 반영하도록 변경을 주기적으로 확인
+    holder = getattr(app.state, 'recommendation', None)
+    watcher = asyncio.create_task(holder.watch()) if holder is not None else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    try:
+        from app.core import recommendation
+        await recommendation.close_async_client()
+    except Exception as e:
+        print(f"Failed to close embedding client: {e}")
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware for Chrome extension
 app.add_middleware(
@@ -11,9 +39,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# 요청 수/처리 시간 집계와 Server-Timing 헤더
+app.middleware("http")(metrics.metrics_middleware)
+
 # Add routers
+app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(test_recommend.router)
 app.include_router(summarize.router)
 
@@ -26,4 +60,5 @@ except Exception as e:
     print(f"Failed to load recommend router: {e}")
     print("Using test router only")
 
-# Skip thumbnail router for now due to dependency issues
\ No newline at end of file
+# 썸네일 생성은 Gemini 클라이언트를 처음 요청 때 만들므로 GOOGLE_API_KEY가 없어도 라우터를 등록할 수 있음
+app.include_router(thumbnail.router)
@@ -1,8 +1,17 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
 
 class RecommendRequest(BaseModel):
     query: str
+    top_k: int = 20
+    # 추천 대상 곡의 언어 목록과 최소 popularity
+    languages: List[str] = Field(default_factory=lambda: ["English", "Korean"])
+    min_popularity: float = 20
+    # feature 유사도 계산 방식: 상위 5개 예시 평균(topn) 또는 미리 계산한 뱅크 centroid(centroid)
+    feature_mode: Literal["topn", "centroid"] = "topn"
+
+class BatchRecommendRequest(BaseModel):
+    queries: List[RecommendRequest]
 
 class TrackInfo(BaseModel):
     track_name: str
@@ -0,0 +1,273 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# 스크립트로 직접 실행해도 app 패키지를 찾을 수 있도록 저장소 루트를 경로에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# 벤치마크는 외부 API를 호출하지 않음: 쿼리 임베딩은 서버와 같은 경로(get_embedding -> 임베딩 캐시 -> 백엔드)로
+# 로컬 백엔드(해시 n-gram 임베딩)에서 받음
+os.environ["MODEL_BACKEND"] = "local"
+# 쿼리 임베딩 디스크 캐시를 쓰지 않음 (로컬 백엔드 임베딩이 실제 캐시에 섞이지 않도록, 메모리 캐시는 사용)
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+# 같은 쿼리를 반복 측정하므로 추천 결과/시맨틱 캐시를 끔 (캐시 적중이 아니라 계산 경로를 잼)
+os.environ["RESULT_CACHE_SIZE"] = "0"
+os.environ["SEMANTIC_CACHE_SIZE"] = "0"
+
+from app.core import metrics, recommendation
+from app.core.backends import get_backend
+from app.core.process_stats import memory_usage
+from app.core.similarity import FeatureSimilarityEngine
+from app.core.state import RecommendationState
+from app.core.track_store import AUDIO_FEATURES, TrackStore
+
+LANGUAGES = ['English', 'Korean', 'Spanish', 'Japanese', 'French']
+QUERY_TEMPLATES = [
+    "카페에서 공부할 때 듣기 좋은 음악 {i}",
+    "비 오는 날 드라이브하면서 듣는 노래 {i}",
+    "운동할 때 신나는 음악 {i}",
+    "잠들기 전에 듣는 잔잔한 곡 {i}",
+    "파티에서 분위기 띄우는 노래 {i}",
+]
+
+
+class _SyntheticNames:
+    """곡 제목/아티스트 이름 테이블 대용 (수백만 개의 문자열을 미리 만들지 않음)."""
+
+    def __init__(self, prefix: str, count: int):
+        self.prefix = prefix
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> str:
+        return f"{self.prefix} {i}"
+
+
+def synthetic_banks(bank_size: int, dim: int, seed: int):
+    """feature별 high/low 예시 문장과 임베딩. 뱅크마다 중심 벡터 주변에 모여 있도록 만듭니다."""
+    rng = np.random.default_rng(seed)
+    feature_sentences = {}
+    feature_embeddings = {}
+    for feature in AUDIO_FEATURES:
+        for direction in ('high', 'low'):
+            key = f"{feature}_{direction}"
+            center = rng.standard_normal(dim).astype(np.float32)
+            feature_sentences[key] = [f"{key} 예시 문장 {i}" for i in range(bank_size)]
+            feature_embeddings[key] = center + 0.8 * rng.standard_normal((bank_size, dim)).astype(np.float32)
+    return feature_sentences, feature_embeddings
+
+
+def synthetic_catalog(tracks: int, seed: int) -> TrackStore:
+    """정규화된 오디오 feature, 언어, popularity, 중복 제목/아티스트를 가진 합성 카탈로그."""
+    rng = np.random.default_rng(seed)
+    features = rng.random((tracks, len(AUDIO_FEATURES)), dtype=np.float32)
+    titles = max(1, tracks // 3)
+    artists = max(1, tracks // 8)
+    return TrackStore(
+        features=features,
+        title_ids=rng.integers(0, titles, tracks, dtype=np.int32),
+        title_names=_SyntheticNames("title", titles),
+        artist_ids=rng.integers(0, artists, tracks, dtype=np.int32),
+        artist_names=_SyntheticNames("artist", artists),
+        language_codes=rng.integers(0, len(LANGUAGES), tracks).astype(np.int16),
+        language_names=LANGUAGES,
+        popularity=rng.integers(0, 100, tracks).astype(np.float64),
+    )
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def measure(fn: Callable[[str], object], queries: List[str], warmup: int = 3) -> Dict:
+    """
+    쿼리마다 fn을 실행해 전체/단계별 지연 시간과 처리량을 잽니다.
+    워밍업은 측정 쿼리와 다른 문장으로 해서, 측정 쿼리의 임베딩이 미리 캐시되지 않도록 합니다.
+    이어서 tracemalloc을 켠 상태로 한 번 더 실행해 Python 힙 최대 사용량을 잽니다. (지연 시간 측정과 분리)
+    """
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        for i in range(warmup):
+            fn(f"워밍업 쿼리 {i}")
+    latencies = []
+    stages: Dict[str, List[float]] = {}
+    start_all = time.perf_counter()
+    for query in queries:
+        timings, token = metrics.start_request_timings()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            fn(query)
+        latencies.append(time.perf_counter() - start)
+        metrics.end_request_timings(token)
+        for stage, seconds in timings.durations.items():
+            stages.setdefault(stage, []).append(seconds)
+        sink.seek(0)
+        sink.truncate()
+    total = time.perf_counter() - start_all
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(sink):
+        for query in queries[:max(1, min(len(queries), 5))]:
+            fn(query)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    def summary(values: List[float]) -> Dict[str, float]:
+        ms = [v * 1000 for v in values]
+        return {
+            "mean": float(np.mean(ms)) if ms else 0.0,
+            "p50": _percentile(ms, 50),
+            "p95": _percentile(ms, 95),
+            "max": max(ms) if ms else 0.0,
+        }
+
+    return {
+        "calls": len(queries),
+        "latency_ms": summary(latencies),
+        "throughput_qps": len(queries) / total if total > 0 else 0.0,
+        "stages_ms": {stage: summary(values) for stage, values in stages.items()},
+        "peak_traced_bytes": int(peak),
+    }
+
+
+def measure_ranking_paths(store: TrackStore, top_k: int, queries: int, seed: int) -> Dict:
+    """
+    기본 언어/popularity 조건에서 전체 점수 계산과 threshold algorithm의 rank_tracks 지연 시간을 잽니다.
+    ratio(구간 평균 곡 수 / window)와 함께 보고, threshold가 빨라지는 ratio로 RANKING_INDEX_MIN_RATIO를 정합니다.
+    """
+    rng = np.random.default_rng(seed)
+    feature_sets = []
+    for _ in range(queries):
+        features = rng.choice(AUDIO_FEATURES, 3, replace=False)
+        feature_sets.append([(str(feature), float(rng.uniform(0.2, 0.6)), str(rng.choice(["high", "low"])))
+                             for feature in features])
+    languages, min_popularity = recommendation.DEFAULT_LANGUAGES, recommendation.DEFAULT_MIN_POPULARITY
+    slices = store.eligible_slices(languages, min_popularity)
+    eligible = sum(end - start for start, end in slices)
+    result = {
+        "eligible": int(eligible),
+        "ratio": eligible / max(len(slices), 1) / recommendation.threshold_window(top_k),
+    }
+    saved = recommendation.RANKING_INDEX_MIN_RATIO
+    try:
+        for name, ratio in (("scan", float("inf")), ("threshold", 0.0)):
+            recommendation.RANKING_INDEX_MIN_RATIO = ratio
+            for top_features in feature_sets[:3]:
+                recommendation.rank_tracks(store, top_features, top_k)
+            latencies = []
+            for top_features in feature_sets:
+                start = time.perf_counter()
+                recommendation.rank_tracks(store, top_features, top_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+            result[f"{name}_p50_ms"] = _percentile(latencies, 50)
+    finally:
+        recommendation.RANKING_INDEX_MIN_RATIO = saved
+    return result
+
+
+def run_size(tracks: int, args) -> Dict:
+    build = {}
+    start = time.perf_counter()
+    feature_sentences, feature_embeddings = synthetic_banks(args.bank_size, args.dim, args.seed)
+    engine = FeatureSimilarityEngine(feature_sentences, feature_embeddings)
+    build["engine_seconds"] = time.perf_counter() - start
+    start = time.perf_counter()
+    store = synthetic_catalog(tracks, args.seed)
+    build["catalog_seconds"] = time.perf_counter() - start
+    state = RecommendationState(feature_sentences, engine, store, signature=("benchmark", tracks, args.seed))
+    # calculate_feature_sim_high_low / find_similar_sentences가 같은 엔진을 쓰도록 캐시에 등록
+    recommendation.get_similarity_engine(feature_sentences, feature_embeddings)
+
+    queries = [QUERY_TEMPLATES[i % len(QUERY_TEMPLATES)].format(i=i) for i in range(args.queries)]
+    functions = {
+        "recommend_tracks": lambda q: recommendation.recommend_tracks(
+            q, top_k=args.top_k, state=state, feature_mode=args.feature_mode),
+        "calculate_feature_sim_high_low": lambda q: recommendation.calculate_feature_sim_high_low(
+            q, feature_sentences, feature_embeddings, n_avg=5, engine=engine, mode=args.feature_mode),
+        "find_similar_sentences": lambda q: recommendation.find_similar_sentences(
+            q, feature_sentences, feature_embeddings, top_k=50, engine=engine),
+    }
+    results = {}
+    for name, fn in functions.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(fn, queries)
+        print(f"  {name}: p50={results[name]['latency_ms']['p50']:.3f}ms "
+              f"p95={results[name]['latency_ms']['p95']:.3f}ms {results[name]['throughput_qps']:.1f} qps")
+    ranking_paths = None
+    if not args.only or "ranking_paths" in args.only:
+        ranking_paths = measure_ranking_paths(store, args.top_k, args.queries, args.seed)
+        print(f"  ranking_paths: ratio={ranking_paths['ratio']:.0f} scan p50={ranking_paths['scan_p50_ms']:.3f}ms "
+              f"threshold p50={ranking_paths['threshold_p50_ms']:.3f}ms")
+    return {
+        "tracks": tracks,
+        "example_sentences": int(engine.matrix.shape[0]),
+        "build": build,
+        "rss_bytes": memory_usage().get("rss"),
+        "functions": results,
+        "ranking_paths": ranking_paths,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstage API 없이 추천 경로의 지연 시간/처리량/메모리를 재는 벤치마크")
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10000, 100000], help="합성 카탈로그 곡 수 (여러 개 가능)")
+    parser.add_argument("--bank-size", type=int, default=30, help="feature 뱅크당 예시 문장 수")
+    parser.add_argument("--dim", type=int, default=None, help="임베딩 차원 (로컬 백엔드 차원과 같아야 함, LOCAL_EMBEDDING_DIM으로 설정)")
+    parser.add_argument("--queries", type=int, default=50, help="함수별 측정 쿼리 수")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--feature-mode", choices=recommendation.FEATURE_MODES, default="topn")
+    parser.add_argument("--only", nargs="*", help="측정할 함수 이름 (기본: 전부, ranking_paths: 곡 순위 계산 경로 비교)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+
+    backend = get_backend()
+    if args.dim is None:
+        args.dim = backend.dim
+    elif args.dim != backend.dim:
+        parser.error(f"--dim {args.dim} does not match the local backend ({backend.dim}); set LOCAL_EMBEDDING_DIM={args.dim}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "embedding_model": recommendation.EMBEDDING_MODEL,
+            "args": vars(args),
+        },
+        "results": [],
+    }
+    for tracks in args.tracks:
+        print(f"[{tracks} tracks]")
+        report["results"].append(run_size(tracks, args))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# 스크립트로 직접 실행해도 app 패키지를 찾을 수 있도록 저장소 루트를 경로에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.core import recommendation
+from app.core.sentence_index import (SENTENCE_INDEX_BACKENDS, ExactSentenceIndex, IVFSentenceIndex,
+                                     build_sentence_index, calibrate_n_probe, load_sentence_index, recall_at_k)
+
+
+def _search_latency(index, queries: np.ndarray, k: int) -> float:
+    """쿼리당 평균 검색 시간(ms)."""
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k)
+    return (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+
+def _probe_queries(matrix: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    """예시 문장 벡터에 노름이 noise 정도인 무작위 벡터를 더한 평가용 쿼리."""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(matrix.shape[0], min(count, matrix.shape[0]), replace=False)
+    scale = noise / np.sqrt(matrix.shape[1])
+    return matrix[picks] + rng.normal(scale=scale, size=(len(picks), matrix.shape[1])).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="예시 문장 검색 인덱스(find_similar_sentences용) 생성")
+    parser.add_argument("--data-dir", default=recommendation.data_dir)
+    parser.add_argument("--backend", choices=sorted(SENTENCE_INDEX_BACKENDS), default="ivf")
+    parser.add_argument("--lists", type=int, default=None, help="IVF 군집 수 (기본 sqrt(문장 수))")
+    parser.add_argument("--probe", type=int, default=None, help="IVF 쿼리당 탐색 군집 수 (시작값, --min-recall을 만족할 때까지 늘림)")
+    parser.add_argument("--k", type=int, default=50, help="recall@k의 k")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="IVF n_probe를 정할 때 요구하는 recall@k")
+    parser.add_argument("--eval-queries", type=int, default=200, help="recall 평가에 쓸 probe 수")
+    parser.add_argument("--noise", type=float, default=0.5, help="평가 쿼리에 더할 노이즈 벡터의 노름")
+    args = parser.parse_args()
+
+    # 임베딩 아티팩트(없으면 JSON)로 만든 엔진의 정규화 행렬에서 인덱스를 만듦
+    with open(os.path.join(args.data_dir, 'example_sentences.json'), 'r', encoding='utf-8') as f:
+        feature_sentences = json.load(f)
+    engine = recommendation.load_similarity_engine(args.data_dir, feature_sentences)
+    matrix = np.asarray(engine.matrix, dtype=np.float32)
+    start = time.time()
+    params = {} if args.backend == ExactSentenceIndex.backend else {"n_lists": args.lists, "n_probe": args.probe}
+    index = build_sentence_index(matrix, args.backend, **params)
+    exact = ExactSentenceIndex(matrix)
+    if isinstance(index, IVFSentenceIndex):
+        # 예시 문장에 노이즈를 더한 쿼리로 전수 탐색 대비 recall@k를 재서 n_probe를 정함
+        n_probe, recall = calibrate_n_probe(index, exact, _probe_queries(matrix, args.eval_queries, args.noise, seed=1),
+                                            args.k, args.min_recall)
+        print(f"n_probe={n_probe}/{index.n_lists}: recall@{args.k}={recall:.4f} (목표 {args.min_recall})")
+        if recall < args.min_recall:
+            print("Warning: 모든 군집을 탐색해도 목표 recall에 못 미칩니다.")
+    out_dir = os.path.join(args.data_dir, recommendation.SENTENCE_INDEX_DIR)
+    index.save(out_dir, model=engine.model)
+    print(f"문장 인덱스 저장 완료: {out_dir}/ (backend={index.backend}, {len(index)}문장, {index.params()}, {time.time() - start:.1f}s)")
+
+    # n_probe를 정할 때 쓰지 않은 쿼리로 저장한 인덱스의 recall@k를 다시 측정
+    index = load_sentence_index(out_dir, matrix)
+    queries = _probe_queries(matrix, args.eval_queries, args.noise, seed=0)
+    recall = recall_at_k(index, exact, queries, args.k)
+    print(f"recall@{args.k}: {recall:.4f} ({len(queries)}개 probe)")
+    print(f"평균 검색 시간: {_search_latency(index, queries, args.k):.3f}ms (exact {_search_latency(exact, queries, args.k):.3f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+# 스크립트로 직접 실행해도 app 패키지를 찾을 수 있도록 저장소 루트를 경로에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.core.track_store import TrackStore
+
+
+def build_track_catalog(csv_path='spotify_tracknames_updated.csv', out_dir='track_catalog'):
+    """
+    Spotify 곡 카탈로그 CSV를 서버가 mmap으로 바로 여는 바이너리 아티팩트로 변환합니다.
+    - 정규화된 오디오 feature 행렬, 언어 코드, popularity (.npy)
+    - 제목/아티스트/URL 문자열 테이블
+    곡은 (언어, popularity 내림차순)으로 정렬되어 저장되므로 서버는 다시 정렬하지 않습니다.
+    """
+    start = time.time()
+    df = pd.read_csv(csv_path, encoding='utf-8')
+    print(f"CSV 로드 완료: {len(df)}곡 ({time.time() - start:.1f}s)")
+    store = TrackStore.from_dataframe(df)
+    store.save(out_dir)
+    print(f"카탈로그 아티팩트 저장 완료: {out_dir}/ ({len(store)}곡, 제목 {len(store.title_names)}개, 아티스트 {len(store.artist_names)}개)")
+    return store
+
+
+if __name__ == "__main__":
+    build_track_catalog(*sys.argv[1:3])
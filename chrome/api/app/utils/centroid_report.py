@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# 스크립트로 직접 실행해도 app 패키지를 찾을 수 있도록 저장소 루트를 경로에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.core import recommendation
+from app.core.similarity import compute_bank_centroids
+from app.core.track_store import AUDIO_FEATURES
+
+
+def _feature_sims(engine, similarities, bank_score):
+    """(쿼리 수 x ...) 유사도에서 쿼리별 {feature: (sim_high, sim_low)}를 만듭니다."""
+    feature_sims = [{} for _ in range(similarities.shape[0])]
+    for feature in AUDIO_FEATURES:
+        high_key, low_key = f"{feature}_high", f"{feature}_low"
+        if not engine.has_feature(high_key) or not engine.has_feature(low_key):
+            continue
+        highs = bank_score(similarities, high_key)
+        lows = bank_score(similarities, low_key)
+        for i in range(similarities.shape[0]):
+            feature_sims[i][feature] = (float(highs[i]), float(lows[i]))
+    return feature_sims
+
+
+def _spearman(a, b) -> float:
+    ra = np.argsort(np.argsort(a)).astype(np.float64)
+    rb = np.argsort(np.argsort(b)).astype(np.float64)
+    ra -= ra.mean()
+    rb -= rb.mean()
+    denom = np.sqrt((ra * ra).sum() * (rb * rb).sum())
+    return float((ra * rb).sum() / denom) if denom else 1.0
+
+
+def holdout_rows(engine, fraction: float, min_keep: int, seed: int = 0) -> np.ndarray:
+    """뱅크마다 fraction만큼의 예시 문장 행을 probe로 떼어 둡니다. (뱅크마다 최소 min_keep개는 남김)"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for start, end in engine.offsets.values():
+        count = min(int((end - start) * fraction), max(end - start - min_keep, 0))
+        if count > 0:
+            rows.append(start + rng.choice(end - start, count, replace=False))
+    return np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+
+
+def _held_out_centroids(engine, probe_rows: np.ndarray):
+    """probe 행을 뺀 나머지 예시 문장으로 엔진과 같은 수의 뱅크별 centroid를 다시 계산합니다."""
+    engine._ensure_centroids()
+    k = max(end - start for start, end in engine.centroid_offsets.values())
+    keep = np.ones(engine.matrix.shape[0], dtype=bool)
+    keep[probe_rows] = False
+    offsets = {}
+    position = 0
+    for feature, (start, end) in engine.offsets.items():
+        count = int(keep[start:end].sum())
+        offsets[feature] = (position, position + count)
+        position += count
+    return compute_bank_centroids(np.asarray(engine.matrix, dtype=np.float32)[keep], offsets, k=k)
+
+
+def agreement_report(engine, probes: np.ndarray, probe_rows=None, n_avg: int = 5, n_top: int = 3):
+    """
+    probe 임베딩마다 기존 top-n 평균 점수와 centroid 점수로 고른 상위 feature를 비교합니다.
+    probe_rows: probe가 예시 문장일 때 그 행 번호 (held-out probe).
+    양쪽 모두 probe 행을 보지 않도록 top-n 평균에서는 probe 행을 모두 빼고, centroid는 probe 행을 뺀 나머지로 다시 계산합니다.
+    """
+    start = time.perf_counter()
+    similarities = engine.batch_similarities(probes)
+    if probe_rows is not None:
+        similarities[:, probe_rows] = -np.inf
+    topn = _feature_sims(engine, similarities, lambda sims, feature: engine.top_mean_batch(sims, feature, n_avg))
+    topn_seconds = time.perf_counter() - start
+
+    if probe_rows is not None:
+        centroids, centroid_offsets = _held_out_centroids(engine, probe_rows)
+
+        def centroid_score(sims, feature):
+            first, last = centroid_offsets[feature]
+            return sims[:, first:last].max(axis=1)
+    else:
+        centroids, centroid_score = None, engine.centroid_score
+
+    start = time.perf_counter()
+    if centroids is None:
+        centroid_similarities = engine.centroid_similarities(probes)
+    else:
+        queries = np.asarray(probes, dtype=np.float32)
+        centroid_similarities = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ centroids.T
+    centroid = _feature_sims(engine, centroid_similarities, centroid_score)
+    centroid_seconds = time.perf_counter() - start
+
+    overlap, top1, direction, spearman = [], [], [], []
+    for reference, candidate in zip(topn, centroid):
+        ref_top = recommendation.select_top_features(reference, n_top)
+        cand_top = recommendation.select_top_features(candidate, n_top)
+        ref_features = {feature for feature, _, _ in ref_top}
+        cand_features = {feature for feature, _, _ in cand_top}
+        overlap.append(len(ref_features & cand_features) / max(len(ref_features), 1))
+        top1.append(bool(ref_top) and bool(cand_top) and ref_top[0][0] == cand_top[0][0])
+        ref_direction = {feature: d for feature, _, d in ref_top}
+        shared = [feature for feature, _, d in cand_top if feature in ref_direction]
+        if shared:
+            cand_direction = {feature: d for feature, _, d in cand_top}
+            direction.append(np.mean([ref_direction[f] == cand_direction[f] for f in shared]))
+        features = sorted(reference)
+        spearman.append(_spearman([max(reference[f]) for f in features], [max(candidate[f]) for f in features]))
+
+    return {
+        "probes": int(len(topn)),
+        "held_out": probe_rows is not None,
+        "n_avg": n_avg,
+        "n_top": n_top,
+        "centroids": int(engine.centroids.shape[0]),
+        "example_rows": int(engine.matrix.shape[0]),
+        "top_features_overlap": float(np.mean(overlap)),
+        "top1_agreement": float(np.mean(top1)),
+        "direction_agreement": float(np.mean(direction)) if direction else None,
+        "relevance_spearman": float(np.mean(spearman)),
+        "topn_seconds": topn_seconds,
+        "centroid_seconds": centroid_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="centroid 모드와 기존 top-n 평균 점수의 일치도 리포트")
+    parser.add_argument("--data-dir", default=recommendation.data_dir)
+    parser.add_argument("--queries", help="한 줄에 하나씩 쿼리를 적은 파일 (없으면 예시 문장 일부를 떼어 probe로 사용)")
+    parser.add_argument("--n-avg", type=int, default=5)
+    parser.add_argument("--holdout", type=float, default=0.2, help="--queries가 없을 때 뱅크마다 probe로 떼어 둘 예시 문장 비율")
+    parser.add_argument("--output", default="centroid_report.json")
+    args = parser.parse_args()
+
+    with open(os.path.join(args.data_dir, 'example_sentences.json'), 'r', encoding='utf-8') as f:
+        feature_sentences = json.load(f)
+    engine = recommendation.load_similarity_engine(args.data_dir, feature_sentences)
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+        embeddings = [e for e in recommendation.get_embeddings(queries) if e]
+        probes = np.asarray(embeddings, dtype=np.float32)
+        probe_rows = None
+    else:
+        probe_rows = holdout_rows(engine, args.holdout, min_keep=args.n_avg)
+        probes = np.asarray(engine.matrix[probe_rows], dtype=np.float32)
+
+    report = agreement_report(engine, probes, probe_rows, n_avg=args.n_avg)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+# 스크립트로 직접 실행해도 app 패키지를 찾을 수 있도록 저장소 루트를 경로에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.core import recommendation
+from app.core.result_cache import DEFAULT_SEMANTIC_THRESHOLD
+from app.core.state import RecommendationState
+
+# 원래 쿼리를 조금씩 바꾼 거의 같은 쿼리 ({q}: 원래 쿼리)
+VARIANT_TEMPLATES = ["{q}.", "{q}!", " {q} ", "{q} 음악", "{q} 노래 추천", "요즘 {q}", "{q} 좋은 곡"]
+THRESHOLDS = sorted({0.85, 0.9, 0.93, 0.95, 0.97, 0.99, DEFAULT_SEMANTIC_THRESHOLD})
+
+
+def _recommend(embedding, state, top_k: int, feature_mode: str):
+    """캐시를 거치지 않고 (상위 feature와 방향, 곡 (제목, 아티스트) 목록)을 계산합니다."""
+    feature_sim = recommendation.feature_sim_from_embedding(embedding, state.engine, n_avg=5, mode=feature_mode)
+    top_features = recommendation.select_top_features(feature_sim)
+    tracks = recommendation.rank_tracks(state.tracks, top_features, top_k)
+    return [(feature, direction) for feature, _, direction in top_features], \
+        [(track["track_name"], track["artist_name"]) for track in tracks]
+
+
+def near_duplicate_report(state, queries, top_k: int = 20, feature_mode: str = "topn"):
+    """
+    쿼리마다 거의 같은 변형 쿼리를 만들어, 시맨틱 캐시가 원래 쿼리의 결과를 재사용했을 때 틀리는 비율을 임계값별로 잽니다.
+    - hit_rate: 변형 쿼리 중 원래 쿼리와의 코사인 유사도가 임계값 이상인 비율 (캐시 적중)
+    - same_features / same_top_k: 적중한 것 중 변형 쿼리를 직접 계산한 상위 feature / 곡 목록이 재사용한 것과 같은 비율
+    - top_k_overlap: 적중한 것 중 두 곡 목록의 평균 겹침 비율
+    """
+    texts = []
+    pairs = []
+    for query in queries:
+        variants = [template.format(q=query) for template in VARIANT_TEMPLATES]
+        pairs.extend((len(texts), len(texts) + 1 + i) for i in range(len(variants)))
+        texts.extend([query] + variants)
+    embeddings = recommendation.get_embeddings(texts)
+    results = [_recommend(embedding, state, top_k, feature_mode) if embedding else None for embedding in embeddings]
+
+    similarity, same_features, same_top_k, overlap = [], [], [], []
+    for base, variant in pairs:
+        if results[base] is None or results[variant] is None:
+            continue
+        a = np.asarray(embeddings[base], dtype=np.float32)
+        b = np.asarray(embeddings[variant], dtype=np.float32)
+        similarity.append(float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b))))
+        same_features.append(results[base][0] == results[variant][0])
+        same_top_k.append(results[base][1] == results[variant][1])
+        overlap.append(len(set(results[base][1]) & set(results[variant][1])) / max(len(results[base][1]), 1))
+    similarity = np.asarray(similarity)
+
+    thresholds = []
+    for threshold in THRESHOLDS:
+        hits = similarity >= threshold
+        count = int(hits.sum())
+        thresholds.append({
+            "threshold": threshold,
+            "hits": count,
+            "hit_rate": float(hits.mean()) if len(hits) else 0.0,
+            "same_features": float(np.mean(np.asarray(same_features)[hits])) if count else None,
+            "same_top_k": float(np.mean(np.asarray(same_top_k)[hits])) if count else None,
+            "top_k_overlap": float(np.mean(np.asarray(overlap)[hits])) if count else None,
+        })
+    return {
+        "queries": len(queries),
+        "pairs": int(len(similarity)),
+        "top_k": top_k,
+        "feature_mode": feature_mode,
+        "model": recommendation.EMBEDDING_MODEL,
+        "similarity_percentiles": {str(q): float(np.percentile(similarity, q)) for q in (5, 25, 50, 75, 95)} if len(similarity) else {},
+        "thresholds": thresholds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시맨틱 캐시 임계값별 적중률과 오답률(재사용한 결과가 직접 계산한 결과와 다른 비율) 리포트")
+    parser.add_argument("--data-dir", default=recommendation.data_dir)
+    parser.add_argument("--queries", help="한 줄에 하나씩 쿼리를 적은 파일 (없으면 예시 문장 일부를 쿼리로 사용)")
+    parser.add_argument("--sample", type=int, default=100, help="--queries가 없을 때 사용할 예시 문장 수")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--feature-mode", choices=recommendation.FEATURE_MODES, default="topn")
+    parser.add_argument("--output", default="semantic_cache_report.json")
+    args = parser.parse_args()
+
+    state = RecommendationState.load(args.data_dir)
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        sentences = [sentence for sentence in state.engine.sentences if sentence]
+        rng = np.random.default_rng(0)
+        queries = [sentences[i] for i in rng.choice(len(sentences), min(args.sample, len(sentences)), replace=False)]
+
+    report = near_duplicate_report(state, queries, args.top_k, args.feature_mode)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -305,27 +305,35 @@ async function handleContentUpdate(content, url) {
         chrome.storage.local.set({ currentContext: context });
         chrome.runtime.sendMessage({ type: 'contextUpdate', context });
         
-        // Get new music recommendations
-        const recommendations = await getMusicRecommendationsWithRetry(context);
-        
-        if (recommendations && recommendations.length > 0) {
-          console.log('[MCP] New recommendations received, stopping current music first');
+        // Get new music recommendations (streamed: start the new playlist as soon as the first track arrives)
+        let playlistStarted = false;
+        const startPlaylist = async (playlist) => {
+          playlistStarted = true;
+          console.log('[MCP] First recommendation received, stopping current music first');
           
           // Force stop current music before starting new playlist
           await stopAllMusic();
           
-          // Update playlist
-          currentPlaylist = recommendations;
+          // Update playlist (the array keeps growing while the rest of the tracks stream in)
+          currentPlaylist = playlist;
           currentPlayIndex = 0;
           playlistContext = context;
           
-          chrome.storage.local.set({ recommendations });
-          chrome.runtime.sendMessage({ type: 'recommendationsUpdate', recommendations });
-          
           // Wait a moment for cleanup, then auto-play the first recommendation
           setTimeout(async () => {
-            await autoPlayMusic(recommendations[0], 0);
+            await autoPlayMusic(playlist[0], 0);
           }, 1000);
+        };
+        const recommendations = await getMusicRecommendationsWithRetry(context, 2, startPlaylist);
+        
+        if (recommendations && recommendations.length > 0) {
+          console.log('[MCP] New recommendations received:', recommendations.length);
+          if (!playlistStarted) {
+            await startPlaylist(recommendations);
+          }
+          
+          chrome.storage.local.set({ recommendations });
+          chrome.runtime.sendMessage({ type: 'recommendationsUpdate', recommendations });
         }
       } else if (context && !contextChanged) {
         console.log('[MCP] Context similar, keeping current playlist. Context:', context);
@@ -453,8 +461,84 @@ async function extractContextWithUpstage(content) {
   }
 }
 
-async function getMusicRecommendations(context) {
+// Streams recommendations from /recommend/stream (NDJSON: features, then tracks in rank order, then done).
+// onFirstTrack(playlist) is called once with the (still growing) playlist array when the first track arrives.
+// Falls back to the non-streaming /recommend endpoint if the server does not support streaming.
+async function getMusicRecommendationsStream(context, onFirstTrack) {
+  console.log('Making streaming request to:', `${API_URL}/recommend/stream`);
+  const response = await fetch(`${API_URL}/recommend/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({
+      query: context
+    })
+  });
+
+  if (response.status === 404 || response.status === 405) {
+    console.log('[MCP] Streaming endpoint not available, using /recommend');
+    return null;
+  }
+  if (!response.ok || !response.body) {
+    const errorText = await response.text();
+    console.error('API error response:', errorText);
+    throw new Error(`API returned ${response.status}: ${response.statusText} - ${errorText}`);
+  }
+
+  const playlist = [];
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let done = false;
+
+  const handleLine = (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    const event = JSON.parse(line);
+    if (event.type === 'features') {
+      console.log('[MCP] Detected features:', event.features.map(f => `${f.feature}:${f.direction}`).join(', '));
+    } else if (event.type === 'track') {
+      playlist.push(event.track);
+      if (playlist.length === 1 && onFirstTrack) {
+        // Do not wait for playback to start; keep reading the stream
+        onFirstTrack(playlist).catch(error => console.error('Error starting playlist:', error));
+      }
+    } else if (event.type === 'done') {
+      done = true;
+    } else if (event.type === 'error') {
+      throw new Error(`API stream error: ${event.message}`);
+    }
+  };
+
+  while (true) {
+    const { value, done: streamDone } = await reader.read();
+    if (streamDone) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.forEach(handleLine);
+  }
+  buffer += decoder.decode();
+  handleLine(buffer);
+
+  if (!done && playlist.length === 0) {
+    throw new Error('Recommendation stream ended before any track was received');
+  }
+  console.log('Received recommendations (streamed):', playlist.length);
+  return playlist;
+}
+
+async function getMusicRecommendations(context, onFirstTrack = null) {
   try {
+    const streamed = await getMusicRecommendationsStream(context, onFirstTrack);
+    if (streamed !== null) {
+      return streamed;
+    }
+
     console.log('Getting recommendations for context:', context);
     console.log('Making request to:', `${API_URL}/recommend`);
     
@@ -501,13 +585,23 @@ async function getMusicRecommendations(context) {
   }
 }
 
-async function getMusicRecommendationsWithRetry(context, maxRetries = 2) {
+async function getMusicRecommendationsWithRetry(context, maxRetries = 2, onFirstTrack = null) {
+  let firstTrackSeen = false;
+  const onFirstTrackOnce = onFirstTrack && (async (playlist) => {
+    firstTrackSeen = true;
+    await onFirstTrack(playlist);
+  });
   for (let attempt = 1; attempt <= maxRetries; attempt++) {
     try {
-      return await getMusicRecommendations(context);
+      return await getMusicRecommendations(context, onFirstTrackOnce);
     } catch (error) {
       console.log(`Music API attempt ${attempt}/${maxRetries} failed:`, error.message);
       
+      // A playlist is already playing from a partial stream; keep it instead of retrying
+      if (firstTrackSeen) {
+        return [];
+      }
+      
       if (attempt === maxRetries) {
         console.error('All music API retry attempts failed');
         chrome.runtime.sendMessage({ 